@@ -0,0 +1,35 @@
+"""
+Helpers shared by the benchmark scripts.
+
+The tools are single files with names like `example-tool-3.py` that OpenWebUI
+loads directly, so they are imported here by path instead of as packages.
+"""
+
+import importlib.util
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TOOL_PATHS = {
+    "web_search": os.path.join(REPO_ROOT, "claude-template", "example-tool-3.py"),
+    "paperless": os.path.join(REPO_ROOT, "claude-template", "example-tool-2.py"),
+    "vikunja": os.path.join(REPO_ROOT, "vikunjbla", "vikunbla_v0_15.py"),
+    "template": os.path.join(REPO_ROOT, "claude-template", "example-tool-4.py"),
+}
+
+
+def load_tool(name):
+    """
+    Import one of the tool files by its short name and return the module.
+    Like OpenWebUI, the module is registered in sys.modules. Extraction workers
+    do not depend on that: they rebuild the module from its TOOL_SOURCE.
+    """
+    module_name = f"tool_{name}"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, TOOL_PATHS[name])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
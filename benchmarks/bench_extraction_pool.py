@@ -0,0 +1,69 @@
+"""
+Throughput of the web search tool's HTML extraction under each EXTRACTION_MODE.
+
+Many concurrent scrapes are simulated by caller threads that each hand pages
+from the corpus to the extractor, the way download threads do during searches:
+inline parses in the caller thread, thread and process go through the shared
+extraction pools.
+
+Usage: python benchmarks/bench_extraction_pool.py [--corpus DIR] [--pages N]
+                                                  [--callers N] [--workers 1,2,4]
+"""
+
+import argparse
+import concurrent.futures
+import glob
+import os
+import time
+
+from _tools import REPO_ROOT, load_tool
+
+
+def run(tool, mode, workers, pages, callers, total):
+    pool = tool.ExtractionPools.get(mode, workers)
+
+    def extract(index):
+        raw = pages[index % len(pages)]
+        if pool is None:
+            return tool.extract_page_text(raw, "utf-8", 5000)
+        return pool.submit(tool.extract_page_text, raw, "utf-8", 5000).result()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=callers) as executor:
+        list(executor.map(extract, range(callers)))  # warm up
+        start = time.perf_counter()
+        list(executor.map(extract, range(total)))
+        return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--corpus", default=os.path.join(REPO_ROOT, "benchmarks", "corpus")
+    )
+    parser.add_argument("--pages", type=int, default=600)
+    parser.add_argument("--callers", type=int, default=16)
+    parser.add_argument("--workers", default="1,2,4")
+    args = parser.parse_args()
+
+    pages = []
+    for path in sorted(glob.glob(os.path.join(args.corpus, "*.htm*"))):
+        with open(path, "rb") as f:
+            pages.append(f.read())
+    if not pages:
+        raise SystemExit(f"No .html files found in {args.corpus}")
+
+    tool = load_tool("web_search")
+    print(
+        f"{os.cpu_count()} CPUs, {args.callers} concurrent callers, {args.pages} pages"
+    )
+    print(f"{'mode':<8} {'workers':>7} {'pages/s':>9}")
+    inline = run(tool, "inline", 0, pages, args.callers, args.pages)
+    print(f"{'inline':<8} {'-':>7} {inline:>9.0f}")
+    for mode in ("thread", "process"):
+        for workers in (int(w) for w in args.workers.split(",")):
+            rate = run(tool, mode, workers, pages, args.callers, args.pages)
+            print(f"{mode:<8} {workers:>7} {rate:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Compare the web search tool's single-pass HTML extraction with the previous
+pipeline (BeautifulSoup parse, get_text, a second BeautifulSoup pass over the
+text, then NFKC, whitespace regex and a per-character emoji filter).
+
+Usage: python benchmarks/bench_html_extract.py [--corpus DIR] [--rounds N]
+
+The corpus is a directory of saved .html pages; benchmarks/corpus is used by default.
+Times are CPU time per page, averaged over the rounds.
+"""
+
+import argparse
+import codecs
+import glob
+import os
+import re
+import time
+import unicodedata
+
+from _tools import REPO_ROOT, load_tool
+
+CHUNK_SIZE = 16384
+
+
+def legacy_extract(raw):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(raw.decode("utf-8", errors="replace"), "html.parser")
+    text = soup.get_text(separator=" ", strip=True)
+    text = BeautifulSoup(text, "html.parser").get_text(separator=" ", strip=True)
+    text = unicodedata.normalize("NFKC", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return "".join(c for c in text if not unicodedata.category(c).startswith("So"))
+
+
+def make_streaming_extract(tool):
+    functions = tool.HelpFunctions()
+    functions.cleanup_patterns()
+
+    def extract(raw):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        page = tool.TextExtractor()
+        for start in range(0, len(raw), CHUNK_SIZE):
+            page.feed(decoder.decode(raw[start : start + CHUNK_SIZE]))
+        page.feed(decoder.decode(b"", final=True))
+        page.close()
+        return functions.format_text(page.text)
+
+    return extract
+
+
+def cpu_time_per_page(extract, raw, rounds):
+    start = time.process_time()
+    for _ in range(rounds):
+        extract(raw)
+    return (time.process_time() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--corpus", default=os.path.join(REPO_ROOT, "benchmarks", "corpus")
+    )
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    pages = sorted(glob.glob(os.path.join(args.corpus, "*.htm*")))
+    if not pages:
+        raise SystemExit(f"No .html files found in {args.corpus}")
+
+    streaming_extract = make_streaming_extract(load_tool("web_search"))
+
+    print(
+        f"{'page':<32} {'KiB':>7} {'legacy ms':>10} {'single ms':>10} {'saved ms':>9} {'words':>13}"
+    )
+    total_legacy = total_single = 0.0
+    for path in pages:
+        with open(path, "rb") as f:
+            raw = f.read()
+        legacy = cpu_time_per_page(legacy_extract, raw, args.rounds)
+        single = cpu_time_per_page(streaming_extract, raw, args.rounds)
+        total_legacy += legacy
+        total_single += single
+        words = (
+            f"{len(legacy_extract(raw).split())}->{len(streaming_extract(raw).split())}"
+        )
+        print(
+            f"{os.path.basename(path)[:32]:<32} {len(raw) / 1024:>7.1f} "
+            f"{legacy * 1000:>10.2f} {single * 1000:>10.2f} "
+            f"{(legacy - single) * 1000:>9.2f} {words:>13}"
+        )
+
+    count = len(pages)
+    print(
+        f"\nMean CPU per page: legacy {total_legacy / count * 1000:.2f} ms, "
+        f"single-pass {total_single / count * 1000:.2f} ms, "
+        f"saved {(total_legacy - total_single) / count * 1000:.2f} ms "
+        f"({(1 - total_single / total_legacy) * 100:.0f}%)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Import cost of each tool module, the price OpenWebUI pays on startup and on
+every edit of a tool.
+
+Each tool is imported in a fresh interpreter. By default the modules OpenWebUI
+itself has loaded (pydantic, asyncio, logging, ...) are imported first so only
+the tool's own cost is counted; --cold measures from an empty interpreter.
+Reports the median import time, memory allocated while importing (tracemalloc,
+in a separate run) and the top-level modules the import pulled in. Exits with
+status 1 when a tool goes over the time or memory budget or imports one of the
+--deferred modules, which should only load on first use.
+
+Usage: python benchmarks/bench_imports.py [--runs N] [--budget-ms MS]
+                                          [--budget-kib KIB] [--cold]
+                                          [--deferred MOD,...] [--only NAME]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from _tools import TOOL_PATHS
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+HOST_MODULES = ["asyncio", "json", "logging", "typing", "urllib.parse", "pydantic"]
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {bench_dir!r})
+from _tools import load_tool
+for name in {preload!r}:
+    __import__(name)
+if {preload!r}:
+    # pydantic loads most of itself (and its plugin entry points) with the
+    # first model, which the host has long since defined.
+    import pydantic
+    class HostModel(pydantic.BaseModel):
+        value: int = pydantic.Field(default=0)
+trace = {trace!r}
+if trace:
+    import tracemalloc
+    tracemalloc.start()
+before = set(sys.modules)
+start = time.perf_counter()
+load_tool({tool!r})
+elapsed = time.perf_counter() - start
+allocated = tracemalloc.get_traced_memory()[0] if trace else 0
+added = sorted({{m.split(".")[0] for m in set(sys.modules) - before}})
+print(json.dumps({{"seconds": elapsed, "bytes": allocated, "modules": added}}))
+"""
+
+
+def probe(tool, preload, trace):
+    code = PROBE.format(bench_dir=BENCH_DIR, preload=preload, trace=trace, tool=tool)
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def measure(tool, args):
+    preload = [] if args.cold else HOST_MODULES
+    # The first run warms the bytecode cache and is not counted.
+    runs = [probe(tool, preload, False) for _ in range(args.runs + 1)][1:]
+    memory = probe(tool, preload, True)
+    ignored = {f"tool_{tool}"}
+    return {
+        "tool": tool,
+        "import_ms": statistics.median(r["seconds"] for r in runs) * 1000,
+        "allocated_kib": memory["bytes"] / 1024,
+        "modules": [m for m in runs[-1]["modules"] if m not in ignored],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=50.0)
+    parser.add_argument("--budget-kib", type=float, default=1536.0)
+    parser.add_argument("--cold", action="store_true")
+    parser.add_argument("--deferred", default="requests,aiohttp,pytz,bs4")
+    parser.add_argument("--only", help="Tool name to measure")
+    args = parser.parse_args()
+
+    deferred = {m.strip() for m in args.deferred.split(",") if m.strip()}
+    failures = []
+    print(f"{'tool':<12} {'import ms':>10} {'alloc KiB':>10}  modules pulled in")
+    for tool in TOOL_PATHS:
+        if args.only and args.only != tool:
+            continue
+        row = measure(tool, args)
+        print(
+            f"{tool:<12} {row['import_ms']:>10.1f} {row['allocated_kib']:>10.0f}  "
+            f"{', '.join(row['modules']) or '-'}",
+            flush=True,
+        )
+        if row["import_ms"] > args.budget_ms:
+            failures.append(f"{tool}: {row['import_ms']:.1f} ms > {args.budget_ms} ms")
+        if row["allocated_kib"] > args.budget_kib:
+            failures.append(
+                f"{tool}: {row['allocated_kib']:.0f} KiB > {args.budget_kib} KiB"
+            )
+        eager = deferred.intersection(row["modules"])
+        if eager:
+            failures.append(f"{tool}: imports {', '.join(sorted(eager))} eagerly")
+
+    for failure in failures:
+        print(f"over budget: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
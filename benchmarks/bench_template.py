@@ -0,0 +1,210 @@
+"""
+Checks and measures the building blocks of the claude-template example-tool-4.py
+template against the mock records API.
+
+First checks the behaviour new tools rely on: repeated calls are answered from
+the cache, concurrent calls for one record share a single request, the cache
+stays within CACHE_SIZE and expires after CACHE_TTL, progress status events are
+throttled to STATUS_INTERVAL and every call reuses one session. Exits with
+status 1 when a check fails.
+
+Then runs --calls concurrent searches (--sessions at a time) with the cache off
+(single-flight still shares concurrent identical requests) and on, and reports
+latency percentiles, backend requests per call, status events and event-loop lag.
+
+Usage: python benchmarks/bench_template.py [--calls N] [--sessions N]
+                                           [--latency MS] [--skip-checks]
+"""
+
+import argparse
+import asyncio
+import time
+
+from _tools import load_tool
+from bench_tools import close_tools, percentile, silence_tool_logging
+from load_test import RecordingEmitter, measure_loop_lag
+from mock_services import MockEnvironment
+
+QUERIES = ["council", "thread", "retrieval", "metasearch", "library", "parser"]
+
+
+def make_tools(env, **valves):
+    tools = env.configure("template", load_tool("template").Tools())
+    for name, value in valves.items():
+        setattr(tools.valves, name, value)
+    return tools
+
+
+def requests_during(env):
+    return env.records.snapshot()[0]
+
+
+async def check_cache(env):
+    tools = make_tools(env)
+    await tools.search_records("council")
+    before = requests_during(env)
+    await tools.search_records("council")
+    await close_tools(tools)
+    sent = requests_during(env) - before
+    return sent == 0, f"repeated search sent {sent} requests, expected 0"
+
+
+async def check_single_flight(env):
+    tools = make_tools(env, CACHE_TTL=0)
+    before = requests_during(env)
+    results = await asyncio.gather(*(tools.get_record(7) for _ in range(50)))
+    await close_tools(tools)
+    sent = requests_during(env) - before
+    ok = sent == 1 and len(set(results)) == 1
+    return ok, f"50 concurrent get_record(7) sent {sent} requests, expected 1"
+
+
+async def check_cache_bound(env):
+    tools = make_tools(env, CACHE_SIZE=10)
+    for record_id in range(1, 31):
+        await tools.get_record(record_id)
+    # The most recently used record must have survived the evictions.
+    before = requests_during(env)
+    await tools.get_record(30)
+    await close_tools(tools)
+    kept = len(tools.cache.entries)
+    ok = kept <= 10 and requests_during(env) == before
+    return ok, f"cache kept {kept} responses with CACHE_SIZE 10"
+
+
+async def check_cache_expiry(env):
+    tools = make_tools(env, CACHE_TTL=1)
+    await tools.get_record(3)
+    await asyncio.sleep(1.1)
+    before = requests_during(env)
+    await tools.get_record(3)
+    await close_tools(tools)
+    sent = requests_during(env) - before
+    return sent == 1, f"get_record after CACHE_TTL sent {sent} requests, expected 1"
+
+
+async def check_throttle(env):
+    counts = {}
+    for interval in (0.0, 60.0):
+        tools = make_tools(env, MAX_RESULTS=40, STATUS_INTERVAL=interval)
+        emitter = RecordingEmitter()
+        await tools.search_records("thread", __event_emitter__=emitter)
+        await close_tools(tools)
+        counts[interval] = len(emitter.events)
+        final = emitter.events[-1][1]["data"]
+    ok = counts[60.0] == 2 and counts[0.0] > 2 and final["done"]
+    return ok, (
+        f"{counts[0.0]} status events unthrottled, {counts[60.0]} with "
+        f"STATUS_INTERVAL 60 (expected 2, the first and the final one)"
+    )
+
+
+async def check_session_reuse(env):
+    tools = make_tools(env)
+    await tools.get_record(1)
+    first = tools.sessions.sessions[tools.valves.API_URL][0]
+    await tools.search_records("library")
+    await tools.get_record(2)
+    same = tools.sessions.sessions[tools.valves.API_URL][0] is first
+    await close_tools(tools)
+    ok = same and len(tools.sessions.sessions) == 0
+    return ok, "3 calls used one session, closed with the tools"
+
+
+CHECKS = [
+    check_cache,
+    check_single_flight,
+    check_cache_bound,
+    check_cache_expiry,
+    check_throttle,
+    check_session_reuse,
+]
+
+
+async def run_checks(env):
+    failures = []
+    for check in CHECKS:
+        ok, detail = await check(env)
+        print(f"{'ok' if ok else 'FAIL':<5} {check.__name__[6:]:<14} {detail}")
+        if not ok:
+            failures.append(check.__name__)
+    return failures
+
+
+async def measure(env, args, cache_ttl):
+    tools = make_tools(env, CACHE_TTL=cache_ttl)
+    semaphore = asyncio.Semaphore(args.sessions)
+    latencies = []
+    events = 0
+
+    async def call(i):
+        nonlocal events
+        emitter = RecordingEmitter()
+        async with semaphore:
+            start = time.perf_counter()
+            await tools.search_records(
+                QUERIES[i % len(QUERIES)], __event_emitter__=emitter
+            )
+            latencies.append(time.perf_counter() - start)
+        events += len(emitter.events)
+
+    lag = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(measure_loop_lag(lag, stop))
+    before = requests_during(env)
+    start = time.perf_counter()
+    await asyncio.gather(*(call(i) for i in range(args.calls)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+    await close_tools(tools)
+    return {
+        "cache": "on" if cache_ttl else "off",
+        "calls_per_s": args.calls / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "requests_per_call": (requests_during(env) - before) / args.calls,
+        "events_per_call": events / args.calls,
+        "lag_p99_ms": percentile(lag, 0.99) * 1000 if lag else 0.0,
+    }
+
+
+async def main_async(args):
+    env = MockEnvironment(tasks=10, documents=10, latency=args.latency / 1000)
+    load_tool("template")
+    silence_tool_logging()
+    try:
+        failures = [] if args.skip_checks else await run_checks(env)
+        print(
+            f"\n{'cache':<6} {'calls/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+            f"{'req/call':>8} {'events/call':>11} {'lag p99 ms':>10}"
+        )
+        for cache_ttl in (0, 300):
+            row = await measure(env, args, cache_ttl)
+            print(
+                f"{row['cache']:<6} {row['calls_per_s']:>8.1f} {row['p50_ms']:>8.1f} "
+                f"{row['p99_ms']:>8.1f} {row['requests_per_call']:>8.2f} "
+                f"{row['events_per_call']:>11.1f} {row['lag_p99_ms']:>10.1f}",
+                flush=True,
+            )
+    finally:
+        env.shutdown()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=20.0, help="API latency in ms")
+    parser.add_argument("--skip-checks", action="store_true")
+    args = parser.parse_args()
+
+    failures = asyncio.run(main_async(args))
+    for failure in failures:
+        print(f"failed: {failure}")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Offline benchmark of the tool methods against the local mock services.
+
+Drives get_todos, get_projects, search_tasks (Vikunja), search_paperless_documents (Paperless),
+search_web and get_website (SearXNG + site farm), search_records
+and get_record (the example-tool-4.py template) and reports per-call latency
+percentiles, requests issued, bytes transferred and peak traced memory.
+
+Usage: python benchmarks/bench_tools.py [--iterations N] [--latency MS]
+                                        [--tasks N] [--projects N] [--documents N]
+                                        [--slow-seconds S] [--no-page-cache]
+                                        [--only NAME] [--json FILE]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+from _tools import load_tool
+from mock_services import MockEnvironment
+
+CALLS = [
+    ("vikunja", "get_todos", lambda tools, env, i: tools.get_todos("Show me my tasks")),
+    (
+        "vikunja",
+        "get_todos (project)",
+        lambda tools, env, i: tools.get_todos(
+            f"Show me my tasks for project Project {i % 5 + 1}"
+        ),
+    ),
+    ("vikunja", "get_projects", lambda tools, env, i: tools.get_projects()),
+    (
+        "vikunja",
+        "search_tasks",
+        lambda tools, env, i: tools.search_tasks(
+            ["invoice", "call garden", "server fix", "taxes", "trip plan"][i % 5]
+        ),
+    ),
+    (
+        "paperless",
+        "search_paperless_documents",
+        lambda tools, env, i: tools.search_paperless_documents(
+            ["invoice", "python", "council", "fusion", "executor"][i % 5]
+        ),
+    ),
+    (
+        "paperless",
+        "search_paperless_documents (filters)",
+        lambda tools, env, i: tools.search_paperless_documents(
+            "",
+            correspondent=f"Correspondent {i % 15 + 1}",
+            created_from="2022",
+            created_to="2023-06",
+        ),
+    ),
+    ("web_search", "search_web", lambda tools, env, i: tools.search_web(f"query {i}")),
+    (
+        "web_search",
+        "get_website",
+        lambda tools, env, i: tools.get_website(
+            f"{env.sites[i % len(env.sites)].url}/page/{i}"
+        ),
+    ),
+    (
+        "template",
+        "search_records",
+        lambda tools, env, i: tools.search_records(
+            ["council", "thread", "retrieval", "metasearch", "library"][i % 5]
+        ),
+    ),
+    ("template", "get_record", lambda tools, env, i: tools.get_record(i % 50 + 1)),
+]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def make_tools(name, env, args, cache_dir):
+    tools = env.configure(name, load_tool(name).Tools())
+    if name == "web_search":
+        tools.valves.PAGE_CACHE_ENABLED = not args.no_page_cache
+        tools.valves.PAGE_CACHE_PATH = os.path.join(cache_dir, "pages.sqlite3")
+    return tools
+
+
+async def close_tools(tools):
+    """Release the (per-user) sessions a Tools instance keeps between calls."""
+    for name in ("users", "sessions"):
+        holder = getattr(tools, name, None)
+        if holder is not None:
+            await asyncio.gather(*[t for t in holder.close() if t is not None])
+
+
+async def bench_call(name, label, call, env, args, cache_dir):
+    tools = make_tools(name, env, args, cache_dir)
+    latencies = []
+    requests_before, bytes_before = env.snapshot()
+    for i in range(args.iterations):
+        start = time.perf_counter()
+        await call(tools, env, i)
+        latencies.append(time.perf_counter() - start)
+    requests_after, bytes_after = env.snapshot()
+    await close_tools(tools)
+
+    # Memory is traced in a separate pass since tracemalloc slows every allocation.
+    tools = make_tools(name, env, args, cache_dir)
+    tracemalloc.start()
+    peak = 0
+    for i in range(args.memory_iterations):
+        tracemalloc.reset_peak()
+        await call(tools, env, args.iterations + i)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+    await close_tools(tools)
+
+    return {
+        "tool": name,
+        "call": label,
+        "iterations": args.iterations,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p90_ms": percentile(latencies, 0.9) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "requests_per_call": (requests_after - requests_before) / args.iterations,
+        "kib_per_call": (bytes_after - bytes_before) / args.iterations / 1024,
+        "peak_mib": peak / 1024 / 1024,
+    }
+
+
+def silence_tool_logging():
+    # Keep the cost of any configured root logging in the measurement but send
+    # the output nowhere.
+    devnull = open(os.devnull, "w")
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(devnull)
+
+
+async def main_async(args):
+    env = MockEnvironment(
+        tasks=args.tasks,
+        projects=args.projects,
+        documents=args.documents,
+        latency=args.latency / 1000,
+        slow_seconds=args.slow_seconds,
+    )
+    for name in ("vikunja", "paperless", "web_search", "template"):
+        load_tool(name)
+    silence_tool_logging()
+
+    rows = []
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for name, label, call in CALLS:
+                if args.only and args.only not in (name, label):
+                    continue
+                rows.append(await bench_call(name, label, call, env, args, cache_dir))
+                print_row(rows[-1])
+    finally:
+        env.shutdown()
+    return rows
+
+
+def print_header():
+    print(
+        f"{'call':<38} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+        f"{'req/call':>8} {'KiB/call':>9} {'peak MiB':>8}"
+    )
+
+
+def print_row(row):
+    print(
+        f"{row['call']:<38} {row['p50_ms']:>8.1f} {row['p90_ms']:>8.1f} "
+        f"{row['p99_ms']:>8.1f} {row['max_ms']:>8.1f} {row['requests_per_call']:>8.1f} "
+        f"{row['kib_per_call']:>9.1f} {row['peak_mib']:>8.2f}",
+        flush=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--memory-iterations", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=5.0, help="API latency in ms")
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--projects", type=int, default=20)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--slow-seconds", type=float, default=5.0)
+    parser.add_argument("--no-page-cache", action="store_true")
+    parser.add_argument("--only", help="Tool name or call label to run")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    print_header()
+    rows = asyncio.run(main_async(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
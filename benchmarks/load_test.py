@@ -0,0 +1,192 @@
+"""
+Concurrent multi-session load test of the tools against the local mock services.
+
+Each tool module is loaded once and a single Tools instance is shared by every
+session, as OpenWebUI does. Methods are called with keyword arguments plus the
+special `__event_emitter__` / `__user__` parameters their signatures ask for.
+All invocations run in one event loop, so blocking calls inside async tool
+methods show up as event-loop lag and as latency for every other session.
+
+Reports throughput, per-method latency percentiles, emitted events, errors and
+event-loop lag (how late a 10 ms heartbeat wakes up).
+
+Usage: python benchmarks/load_test.py [--calls N] [--sessions N] [--users N]
+                                      [--latency MS] [--mix NAME=WEIGHT,...]
+                                      [--paperless-capacity N]
+"""
+
+import argparse
+import asyncio
+import inspect
+import random
+import time
+
+from _tools import load_tool
+from bench_tools import close_tools, percentile, silence_tool_logging
+from mock_services import MockEnvironment
+
+METHODS = {
+    "get_todos": ("vikunja", lambda i: {"query": "Show me my tasks"}),
+    "get_projects": ("vikunja", lambda i: {}),
+    "search_tasks": (
+        "vikunja",
+        lambda i: {"query": ["invoice", "garden", "server fix"][i % 3]},
+    ),
+    "search_paperless_documents": (
+        "paperless",
+        lambda i: {"query": ["invoice", "python", "council", "fusion"][i % 4]},
+    ),
+    "search_web": ("web_search", lambda i: {"query": f"load query {i % 50}"}),
+    "search_records": (
+        "template",
+        lambda i: {"query": ["council", "thread", "retrieval"][i % 3]},
+    ),
+}
+
+DEFAULT_MIX = "get_todos=3,get_projects=1,search_paperless_documents=3,search_web=2"
+
+
+class RecordingEmitter:
+    """Stands in for OpenWebUI's per-request `__event_emitter__`."""
+
+    def __init__(self):
+        self.events = []
+
+    async def __call__(self, event):
+        self.events.append((time.perf_counter(), event))
+
+
+async def invoke(tools, method, kwargs, user):
+    function = getattr(tools, method)
+    parameters = inspect.signature(function).parameters
+    emitter = RecordingEmitter()
+    extra = {}
+    if "__event_emitter__" in parameters:
+        extra["__event_emitter__"] = emitter
+    if "__user__" in parameters:
+        extra["__user__"] = user
+    start = time.perf_counter()
+    result = await function(**kwargs, **extra)
+    return time.perf_counter() - start, emitter.events, result
+
+
+async def measure_loop_lag(samples, stop, interval=0.01):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+def is_error(result):
+    text = result if isinstance(result, str) else ""
+    return text.startswith("Error") or '"error"' in text[:200]
+
+
+async def run(args):
+    env = MockEnvironment(
+        tasks=args.tasks,
+        documents=args.documents,
+        latency=args.latency / 1000,
+        slow_seconds=args.slow_seconds,
+        paperless_capacity=args.paperless_capacity,
+    )
+    tools = {
+        name: env.configure(name, load_tool(name).Tools())
+        for name in ("vikunja", "paperless", "web_search", "template")
+    }
+    silence_tool_logging()
+
+    mix = []
+    for item in args.mix.split(","):
+        method, weight = item.split("=")
+        mix.extend([method.strip()] * int(weight))
+    rng = random.Random(args.seed)
+    plan = [rng.choice(mix) for _ in range(args.calls)]
+    users = [
+        {"id": f"user-{i}", "name": f"User {i}", "role": "user"}
+        for i in range(args.users)
+    ]
+
+    latencies = {method: [] for method in METHODS}
+    events = errors = 0
+    semaphore = asyncio.Semaphore(args.sessions)
+
+    async def session_call(i, method):
+        nonlocal events, errors
+        tool_name, make_kwargs = METHODS[method]
+        async with semaphore:
+            try:
+                elapsed, emitted, result = await invoke(
+                    tools[tool_name], method, make_kwargs(i), users[i % len(users)]
+                )
+            except Exception:
+                errors += 1
+                return
+        latencies[method].append(elapsed)
+        events += len(emitted)
+        errors += is_error(result)
+
+    lag = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(measure_loop_lag(lag, stop))
+    requests_before, bytes_before = env.snapshot()
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(session_call(i, m) for i, m in enumerate(plan)))
+    finally:
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await monitor
+        requests_after, bytes_after = env.snapshot()
+        for instance in tools.values():
+            await close_tools(instance)
+        env.shutdown()
+
+    print(
+        f"{args.calls} calls, {args.sessions} concurrent sessions, {args.users} users: "
+        f"{args.calls / elapsed:.1f} calls/s over {elapsed:.1f} s"
+    )
+    print(
+        f"backend requests {requests_after - requests_before}, "
+        f"{(bytes_after - bytes_before) / 1024 / 1024:.1f} MiB, "
+        f"{events} status events, {errors} errors, "
+        f"{env.paperless.overloaded} Paperless 503s"
+    )
+    if lag:
+        print(
+            f"event-loop lag ms: p50 {percentile(lag, 0.5) * 1000:.1f} "
+            f"p99 {percentile(lag, 0.99) * 1000:.1f} max {max(lag) * 1000:.1f}"
+        )
+    print(f"\n{'method':<28} {'calls':>6} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+    for method, values in latencies.items():
+        if values:
+            print(
+                f"{method:<28} {len(values):>6} {percentile(values, 0.5) * 1000:>8.1f} "
+                f"{percentile(values, 0.9) * 1000:>8.1f} "
+                f"{percentile(values, 0.99) * 1000:>8.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=20.0, help="API latency in ms")
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--slow-seconds", type=float, default=5.0)
+    parser.add_argument(
+        "--paperless-capacity",
+        type=int,
+        default=0,
+        help="Concurrent requests the mock Paperless serves before answering 503",
+    )
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,497 @@
+"""
+Local stand-ins for the services the tools talk to, for benchmarks and load tests.
+
+- Vikunja: /api/v1/projects and paginated /api/v1/tasks/all
+- Paperless: /api/documents/ (with id and created date filters), /api/tags/,
+  /api/correspondents/<id>/, /api/document_types/<id>/,
+  answering 503 beyond `capacity` concurrent requests to mimic an overloaded server
+- Records (the claude-template example-tool-4.py API): /api/search?q= and
+  /api/records/<id>
+- SearXNG: /search?format=json, with results pointing at the site farm
+- Site farm: HTML pages built from benchmarks/corpus plus slow, large, broken,
+  PDF and duplicate pages. Pages send an ETag and answer 304 to If-None-Match.
+
+Every service counts the requests it answered and the body bytes it actually
+sent, so benchmarks can report traffic per tool call.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from _tools import REPO_ROOT
+
+CORPUS_DIR = os.path.join(REPO_ROOT, "benchmarks", "corpus")
+
+SITE_KINDS = {
+    "page": 70,
+    "slow": 8,
+    "large": 6,
+    "broken": 6,
+    "pdf": 5,
+    "duplicate": 5,
+}
+
+
+class Response:
+    def __init__(
+        self, body=b"", status=200, content_type="application/json", headers=None
+    ):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+        elif isinstance(body, str):
+            body = body.encode()
+        self.body = body
+        self.status = status
+        self.content_type = content_type
+        self.headers = headers or {}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, clients that
+    # keep connections alive stall on delayed ACKs like no real server makes them.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        parsed = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        if not server.enter():
+            server.count(requests=1)
+            self.send(Response({"detail": "Server overloaded"}, status=503))
+            return
+        try:
+            if server.latency:
+                time.sleep(server.latency)
+            response = server.handle_route(parsed.path, query, self.headers)
+        finally:
+            server.leave()
+        server.count(requests=1)
+        self.send(response)
+
+    def send(self, response):
+        server = self.server
+        self.send_response(response.status)
+        if response.status != 304:
+            self.send_header("Content-Type", response.content_type)
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(response.body)))
+        self.end_headers()
+        for start in range(0, len(response.body), 65536):
+            chunk = response.body[start : start + 65536]
+            try:
+                self.wfile.write(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+                return
+            server.count(bytes_sent=len(chunk))
+
+
+class MockService(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, name, host="127.0.0.1", latency=0.0, capacity=0):
+        super().__init__((host, 0), Handler)
+        self.name = name
+        self.latency = latency
+        self.capacity = capacity
+        self.in_flight = 0
+        self.overloaded = 0
+        self.routes = []
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_sent = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def route(self, pattern, handler):
+        self.routes.append((re.compile(pattern), handler))
+
+    def handle_route(self, path, query, headers):
+        for pattern, handler in self.routes:
+            match = pattern.fullmatch(path)
+            if match:
+                return handler(query, headers, *match.groups())
+        return Response({"detail": "Not found."}, status=404)
+
+    def enter(self):
+        """Admit a request, or refuse it when `capacity` requests are in flight."""
+        with self.lock:
+            if self.capacity and self.in_flight >= self.capacity:
+                self.overloaded += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def count(self, requests=0, bytes_sent=0):
+        with self.lock:
+            self.requests += requests
+            self.bytes_sent += bytes_sent
+
+    def snapshot(self):
+        with self.lock:
+            return self.requests, self.bytes_sent
+
+    def handle_error(self, request, client_address):
+        pass
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def vikunja_service(projects=20, tasks=500, latency=0.0, seed=1):
+    rng = random.Random(seed)
+    project_list = [{"id": i, "title": f"Project {i}"} for i in range(1, projects + 1)]
+    task_list = [
+        {
+            "id": i,
+            "title": f"Task {i}: {rng.choice(['Call', 'Email', 'Review', 'Fix', 'Plan'])} "
+            f"{rng.choice(['invoice', 'garden', 'report', 'server', 'trip', 'taxes'])}",
+            "description": f"<p>Details for task {i}</p>",
+            "done": rng.random() < 0.3,
+            "due_date": rng.choice(
+                [
+                    "0001-01-01T00:00:00Z",
+                    f"2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T09:00:00Z",
+                ]
+            ),
+            "project_id": rng.randint(1, projects),
+            "labels": [{"id": 1, "title": rng.choice(["home", "work", "urgent"])}],
+            "updated": f"2024-05-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00Z",
+        }
+        for i in range(1, tasks + 1)
+    ]
+
+    def get_projects(query, headers):
+        return Response(project_list)
+
+    def get_tasks(query, headers):
+        page = int(query.get("page", 1))
+        per_page = int(query.get("per_page", 50))
+        start = (page - 1) * per_page
+        ordered = task_list
+        if query.get("sort_by") in ("id", "updated"):
+            key = query["sort_by"]
+            ordered = sorted(
+                task_list,
+                key=lambda task: task[key],
+                reverse=query.get("order_by") == "desc",
+            )
+        return Response(ordered[start : start + per_page])
+
+    service = MockService("vikunja", latency=latency)
+    service.route(r"/api/v1/projects", get_projects)
+    service.route(r"/api/v1/tasks/all", get_tasks)
+    service.projects = project_list
+    service.tasks = task_list
+    return service
+
+
+def paperless_service(
+    documents=200,
+    tags=30,
+    correspondents=15,
+    document_types=8,
+    latency=0.0,
+    capacity=0,
+    seed=2,
+):
+    rng = random.Random(seed)
+    words = corpus_words()
+    document_list = [
+        {
+            "id": i,
+            "title": f"Document {i}",
+            "content": " ".join(rng.choice(words) for _ in range(400)),
+            "tags": rng.sample(range(1, tags + 1), k=min(3, tags)),
+            "document_type": rng.randint(1, document_types),
+            "correspondent": rng.randint(1, correspondents),
+            "created": f"202{rng.randint(0, 4)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+            "original_file_name": f"scan_{i:05d}.pdf",
+        }
+        for i in range(1, documents + 1)
+    ]
+
+    def named(prefix, count):
+        return {i: {"id": i, "name": f"{prefix} {i}"} for i in range(1, count + 1)}
+
+    tag_map = named("Tag", tags)
+    correspondent_map = named("Correspondent", correspondents)
+    document_type_map = named("Type", document_types)
+
+    def listing(items, query):
+        page_size = int(query.get("page_size", 25))
+        page = int(query.get("page", 1))
+        start = (page - 1) * page_size
+        return Response(
+            {
+                "count": len(items),
+                "next": (
+                    None if start + page_size >= len(items) else f"?page={page + 1}"
+                ),
+                "previous": None,
+                "results": items[start : start + page_size],
+            }
+        )
+
+    def matches_filters(document, query):
+        for field in ("correspondent", "document_type"):
+            ids = query.get(f"{field}__id__in")
+            if ids and str(document[field]) not in ids.split(","):
+                return False
+        tag_ids = query.get("tags__id__in")
+        if tag_ids and not set(map(int, tag_ids.split(","))) & set(document["tags"]):
+            return False
+        created = document["created"]
+        if query.get("created__date__gt") and created <= query["created__date__gt"]:
+            return False
+        if query.get("created__date__lt") and created >= query["created__date__lt"]:
+            return False
+        return True
+
+    def get_documents(query, headers):
+        results = [d for d in document_list if matches_filters(d, query)]
+        terms = query.get("query", "").lower().split()
+        if terms:
+            results = [
+                d for d in results if any(t in d["content"] for t in terms)
+            ] or results
+        elif query.get("ordering") == "-created":
+            results = sorted(results, key=lambda d: d["created"], reverse=True)
+        return listing(results, query)
+
+    def get_one(items):
+        def handler(query, headers, item_id):
+            item = items.get(int(item_id))
+            return Response(item) if item else Response({"detail": "Not found."}, 404)
+
+        return handler
+
+    service = MockService("paperless", latency=latency, capacity=capacity)
+    service.route(r"/api/documents/", get_documents)
+    service.route(r"/api/tags/", lambda q, h: listing(list(tag_map.values()), q))
+    service.route(
+        r"/api/correspondents/",
+        lambda q, h: listing(list(correspondent_map.values()), q),
+    )
+    service.route(
+        r"/api/document_types/",
+        lambda q, h: listing(list(document_type_map.values()), q),
+    )
+    service.route(r"/api/tags/(\d+)/", get_one(tag_map))
+    service.route(r"/api/correspondents/(\d+)/", get_one(correspondent_map))
+    service.route(r"/api/document_types/(\d+)/", get_one(document_type_map))
+    service.documents = document_list
+    return service
+
+
+def records_service(records=500, latency=0.0, seed=4):
+    rng = random.Random(seed)
+    words = corpus_words()
+    record_map = {
+        i: {
+            "id": i,
+            "title": " ".join(rng.choice(words) for _ in range(4)).capitalize(),
+            "content": " ".join(rng.choice(words) for _ in range(300)),
+            "tags": rng.sample(["home", "work", "urgent", "archive", "travel"], k=2),
+            "updated": f"2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T12:00:00Z",
+        }
+        for i in range(1, records + 1)
+    }
+
+    def search(query, headers):
+        terms = query.get("q", "").lower().split()
+        limit = int(query.get("limit", 10))
+        hits = [
+            {"id": r["id"], "title": r["title"]}
+            for r in record_map.values()
+            if any(t in r["title"].lower() or t in r["content"] for t in terms)
+        ]
+        return Response({"count": len(hits), "results": hits[:limit]})
+
+    def get_record(query, headers, record_id):
+        record = record_map.get(int(record_id))
+        return Response(record) if record else Response({"detail": "Not found."}, 404)
+
+    service = MockService("records", latency=latency)
+    service.route(r"/api/search", search)
+    service.route(r"/api/records/(\d+)", get_record)
+    service.records = record_map
+    return service
+
+
+def corpus_pages():
+    pages = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.htm*"))):
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+    return pages
+
+
+def corpus_words():
+    text = " ".join(re.sub(r"<[^>]+>", " ", page) for page in corpus_pages())
+    return [w for w in re.findall(r"[A-Za-z]{3,}", text)]
+
+
+def site_farm(hosts=4, slow_seconds=5.0, large_bytes=3_000_000, seed=3):
+    """
+    One server per host so per-host limits in the scraper see several sites.
+    Extra loopback addresses (127.0.0.2, ...) are used where the OS allows it.
+    """
+    pages = corpus_pages()
+    words = corpus_words()
+    servers = []
+    for index in range(hosts):
+        host = f"127.0.0.{index + 2}"
+        try:
+            server = MockService(f"site{index}", host=host)
+        except OSError:
+            server = MockService(f"site{index}")
+        servers.append(server)
+
+    def page_body(page_id):
+        rng = random.Random(f"{seed}-{page_id}")
+        paragraphs = "".join(
+            "<p>" + " ".join(rng.choice(words) for _ in range(60)) + ".</p>"
+            for _ in range(8)
+        )
+        template = pages[page_id % len(pages)]
+        return template.replace("</main>", paragraphs + "</main>", 1).replace(
+            "</body>", paragraphs + "</body>", 1
+        )
+
+    def handler(query, headers, kind, page_id):
+        page_id = int(page_id)
+        etag = '"' + hashlib.md5(f"{kind}{page_id}".encode()).hexdigest() + '"'
+        if kind == "broken":
+            return Response(
+                "Internal Server Error", status=500, content_type="text/plain"
+            )
+        if kind == "pdf":
+            return Response(
+                b"%PDF-1.7\n" + b"0" * 500_000, content_type="application/pdf"
+            )
+        if headers.get("If-None-Match") == etag:
+            return Response(status=304, headers={"ETag": etag})
+        if kind == "slow":
+            time.sleep(slow_seconds)
+        if kind == "large":
+            body = page_body(page_id)
+            body = body.replace(
+                "</body>", "<p>" + "filler " * (large_bytes // 7) + "</p></body>"
+            )
+        elif kind == "duplicate":
+            body = page_body(0)
+        else:
+            body = page_body(page_id)
+        return Response(
+            body, content_type="text/html; charset=utf-8", headers={"ETag": etag}
+        )
+
+    for server in servers:
+        server.route(r"/(\w+)/(\d+)", handler)
+    return servers
+
+
+def searxng_service(sites, results_per_query=10, pages_per_kind=200, latency=0.0):
+    kinds = list(SITE_KINDS)
+    weights = [SITE_KINDS[k] for k in kinds]
+
+    def search(query, headers):
+        rng = random.Random(query.get("q", ""))
+        results = []
+        for rank in range(results_per_query):
+            kind = rng.choices(kinds, weights)[0]
+            site = rng.choice(sites)
+            page_id = rng.randrange(pages_per_kind)
+            results.append(
+                {
+                    "title": f"Result {rank + 1} ({kind})",
+                    "url": f"{site.url}/{kind}/{page_id}",
+                    "content": f"Snippet for {query.get('q', '')} on a {kind} page",
+                }
+            )
+        return Response({"query": query.get("q", ""), "results": results})
+
+    service = MockService("searxng", latency=latency)
+    service.route(r"/search", search)
+    return service
+
+
+class MockEnvironment:
+    """Starts every stand-in service and points tool valves at them."""
+
+    def __init__(
+        self,
+        tasks=500,
+        projects=20,
+        documents=200,
+        latency=0.0,
+        slow_seconds=5.0,
+        site_hosts=4,
+        paperless_capacity=0,
+    ):
+        self.vikunja = vikunja_service(
+            projects=projects, tasks=tasks, latency=latency
+        ).start()
+        self.paperless = paperless_service(
+            documents=documents, latency=latency, capacity=paperless_capacity
+        ).start()
+        self.sites = [
+            s.start() for s in site_farm(hosts=site_hosts, slow_seconds=slow_seconds)
+        ]
+        self.searxng = searxng_service(self.sites, latency=latency).start()
+        self.records = records_service(latency=latency).start()
+
+    @property
+    def services(self):
+        return [self.vikunja, self.paperless, self.searxng, self.records] + self.sites
+
+    def snapshot(self):
+        requests = bytes_sent = 0
+        for service in self.services:
+            r, b = service.snapshot()
+            requests += r
+            bytes_sent += b
+        return requests, bytes_sent
+
+    def configure(self, name, tools):
+        valves = tools.valves
+        if name == "vikunja":
+            valves.VIKUNJA_BASE_URL = self.vikunja.url
+            valves.VIKUNJA_API_TOKEN = "benchmark"
+        elif name == "paperless":
+            valves.PAPERLESS_URL = self.paperless.url + "/"
+            valves.PAPERLESS_TOKEN = "benchmark"
+        elif name == "web_search":
+            valves.SEARXNG_ENGINE_API_BASE_URL = self.searxng.url + "/search"
+        elif name == "template":
+            valves.API_URL = self.records.url + "/"
+            valves.API_TOKEN = "benchmark"
+        return tools
+
+    def shutdown(self):
+        for service in self.services:
+            service.shutdown()
+            service.server_close()
@@ -47,13 +47,47 @@ The objects served by the document endpoint contain the following fields:
 
 
 import json
-import aiohttp
+import asyncio
+import calendar
+import contextlib
+import importlib
+import logging
+import random
+import threading
+import time
+from datetime import date, timedelta
 from typing import Optional, Callable, Any, List, Dict
 from pydantic import BaseModel, Field
 from urllib.parse import urljoin
 
+logger = logging.getLogger(__name__)
+
+
+class LazyImport:
+    """
+    Stands in for a module and imports it on first attribute access, so loading
+    the tool does not pay for dependencies until a call needs them.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+aiohttp = LazyImport("aiohttp")
+
 
 class PaperlessDocumentLoader:
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    METADATA_PAGE_SIZE = 1000
+    BACKOFF_BASE = 0.5
+    BACKOFF_CAP = 5.0
+
     def __init__(
         self,
         base_url: str,
@@ -61,92 +95,631 @@ class PaperlessDocumentLoader:
         query: Optional[str] = None,
         max_documents: int = 5,
         max_content_length: int = 500,
+        metrics=None,
+        user=None,
+        cache_ttl: int = 0,
+        limiter=None,
+        deadline: Optional[float] = None,
+        request_timeout: float = 10.0,
+        attempts: int = 3,
     ):
         self.base_url = base_url
         self.token = token
         self.query = query
         self.max_documents = max_documents
         self.max_content_length = max_content_length
-
-    async def load(self) -> List[Dict[str, Any]]:
-        url = urljoin(self.base_url, "api/documents/")
+        self.metrics = metrics or NO_METRICS
+        self.user = user
+        self.cache_ttl = cache_ttl
+        self.limiter = limiter or AdaptiveLimiter()
+        self.deadline = deadline or time.monotonic() + 60
+        self.request_timeout = request_timeout
+        self.attempts = max(1, attempts)
+
+    @contextlib.asynccontextmanager
+    async def client(self):
+        if self.user is not None:
+            yield self.user.client()
+        else:
+            async with aiohttp.ClientSession() as session:
+                yield session
+
+    def cached(self, key):
+        return self.user.cached(key) if self.user is not None else None
+
+    def remember(self, key, value):
+        if self.user is not None:
+            self.user.remember(key, value, self.cache_ttl)
+        return value
+
+    def backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        # Full jitter, so clients retrying after the same overload spread out.
+        delay = random.uniform(0, min(self.BACKOFF_CAP, self.BACKOFF_BASE * 2**attempt))
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        return delay
+
+    async def request(self, path: str, params: Optional[dict] = None):
+        """
+        GET a Paperless API path through the adaptive limiter. 429/5xx answers and
+        timeouts are retried with jittered backoff while attempts and the call's
+        deadline allow. Returns the status and the JSON body (text on errors).
+        """
+        url = urljoin(self.base_url, path)
         headers = {"Authorization": f"Token {self.token}"}
-        params = {"query": self.query, "page_size": self.max_documents}
+        for attempt in range(self.attempts):
+            remaining = self.deadline - time.monotonic()
+            if remaining <= 0:
+                raise Exception(f"Error: Paperless did not answer {path} in time")
+            try:
+                await asyncio.wait_for(self.limiter.acquire(), remaining)
+            except asyncio.TimeoutError:
+                raise Exception(f"Error: Paperless is too busy to answer {path}")
+
+            status, payload, retry_after, error = None, None, None, None
+            start = time.monotonic()
+            try:
+                timeout = aiohttp.ClientTimeout(
+                    total=min(self.request_timeout, self.deadline - start)
+                )
+                async with self.client() as session:
+                    async with session.get(
+                        url, headers=headers, params=params, timeout=timeout
+                    ) as response:
+                        self.metrics.count(
+                            requests=1, bytes=response.content_length or 0
+                        )
+                        status = response.status
+                        if status == 200:
+                            payload = await response.json()
+                        else:
+                            payload = await response.text()
+                            retry_after = response.headers.get("Retry-After")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            finally:
+                self.limiter.release(
+                    time.monotonic() - start,
+                    overloaded=error is not None or status in self.RETRY_STATUSES,
+                )
+
+            if error is None and status not in self.RETRY_STATUSES:
+                return status, payload
+            delay = self.backoff(attempt, retry_after)
+            if (
+                attempt + 1 == self.attempts
+                or time.monotonic() + delay >= self.deadline
+            ):
+                break
+            await asyncio.sleep(delay)
+
+        if error is not None:
+            raise Exception(
+                f"Error: Paperless request {path} failed: {type(error).__name__} {error}"
+            )
+        return status, payload
+
+    async def load(self, filters: Optional[dict] = None) -> List[Dict[str, Any]]:
+        params = {"page_size": self.max_documents, **(filters or {})}
+        if self.query and self.query.strip():
+            params["query"] = self.query
+        else:
+            params["ordering"] = "-created"
 
         documents = []
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    for result in data.get("results", []):
-                        document = {
-                            "id": result.get("id"),
-                            "title": result.get("title", "Untitled"),
-                            "content": result.get("content", "No content available")[
-                                : self.max_content_length
-                            ],
-                            "tags": result.get("tags", []),
-                            "document_type": result.get("document_type"),
-                            "correspondent": result.get("correspondent"),
-                            "created": result.get("created", "Unknown"),
-                            "original_file_name": result.get(
-                                "original_file_name", "Unknown"
-                            ),
-                        }
-                        documents.append(document)
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"Error: {response.status}, Details: {error_text}")
+        status, data = await self.request("api/documents/", params)
+        if status == 200:
+            for result in data.get("results", []):
+                document = {
+                    "id": result.get("id"),
+                    "title": result.get("title", "Untitled"),
+                    "content": result.get("content", "No content available")[
+                        : self.max_content_length
+                    ],
+                    "tags": result.get("tags", []),
+                    "document_type": result.get("document_type"),
+                    "correspondent": result.get("correspondent"),
+                    "created": result.get("created", "Unknown"),
+                    "original_file_name": result.get("original_file_name", "Unknown"),
+                }
+                documents.append(document)
+        else:
+            raise Exception(f"Error: {status}, Details: {data}")
 
         return documents
 
-    async def get_tag_names(self, tag_ids: List[int]) -> Dict[int, str]:
-        url = urljoin(self.base_url, "api/tags/")
-        headers = {"Authorization": f"Token {self.token}"}
-        tag_dict = {}
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    tags = data.get("results", [])
-                    tag_dict = {tag["id"]: tag["name"] for tag in tags}
-                else:
-                    error_text = await response.text()
-                    raise Exception(
-                        f"Error fetching tags: {response.status}, Details: {error_text}"
-                    )
+    async def get_names(self, kind: str) -> Dict[int, str]:
+        """
+        Every tag, correspondent or document type (kind "tags", "correspondents",
+        "document_types") as an id -> name map, cached for the user.
+        """
+        names = self.cached(kind)
+        if names is not None:
+            return names
+
+        names = {}
+        page = 1
+        while True:
+            status, data = await self.request(
+                f"api/{kind}/", {"page_size": self.METADATA_PAGE_SIZE, "page": page}
+            )
+            if status != 200:
+                raise Exception(f"Error fetching {kind}: {status}, Details: {data}")
+            names.update({item["id"]: item["name"] for item in data.get("results", [])})
+            if not data.get("next"):
+                break
+            page += 1
+
+        return self.remember(kind, names)
 
-        return tag_dict
+    async def get_tag_names(self, tag_ids: List[int]) -> Dict[int, str]:
+        return await self.get_names("tags")
+
+    async def get_name(self, kind: str, item_id: int, unknown: str) -> str:
+        names = self.cached(f"{kind}s")
+        if names is not None and item_id in names:
+            return names[item_id]
+        name = self.cached((kind, item_id))
+        if name is not None:
+            return name
+        try:
+            status, data = await self.request(f"api/{kind}s/{item_id}/")
+        except Exception as e:
+            # Names only decorate the results, so a lookup that gave up is not
+            # worth failing the whole search over.
+            logger.warning(f"Paperless {kind} {item_id} lookup failed: {e}")
+            return unknown
+        if status != 200:
+            return unknown
+        return self.remember((kind, item_id), data.get("name", unknown))
+
+    async def build_filters(
+        self,
+        correspondent: str = "",
+        document_type: str = "",
+        tags: str = "",
+        created_from: str = "",
+        created_to: str = "",
+    ) -> Dict[str, str]:
+        """
+        Paperless filter parameters for the given names and dates. Names are
+        matched case-insensitively against the cached metadata maps, exactly if
+        possible and as a substring otherwise.
+        """
+        # (filter field, metadata kind, label, requested names)
+        requested = [
+            ("correspondent", "correspondents", "correspondent", [correspondent]),
+            ("document_type", "document_types", "document type", [document_type]),
+            ("tags", "tags", "tag", tags.split(",")),
+        ]
+        wanted = []
+        for field, kind, label, names in requested:
+            names = [name for name in names if name.strip()]
+            if names:
+                wanted.append((field, kind, label, names))
+        maps = await asyncio.gather(*(self.get_names(item[1]) for item in wanted))
+
+        filters = {}
+        for (field, kind, label, names), known in zip(wanted, maps):
+            ids = set()
+            for name in names:
+                ids.update(match_ids(known, name, label))
+            filters[f"{field}__id__in"] = ",".join(map(str, sorted(ids)))
+        # Paperless date filters are exclusive, the tool's bounds inclusive.
+        if created_from.strip():
+            first, _ = date_range(created_from)
+            filters["created__date__gt"] = (first - timedelta(days=1)).isoformat()
+        if created_to.strip():
+            _, last = date_range(created_to)
+            filters["created__date__lt"] = (last + timedelta(days=1)).isoformat()
+        return filters
 
     async def get_correspondent_name(self, correspondent_id: int) -> str:
         if correspondent_id is None:
             return "No correspondent"
-        url = urljoin(self.base_url, f"api/correspondents/{correspondent_id}/")
-        headers = {"Authorization": f"Token {self.token}"}
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data.get("name", "Unknown correspondent")
-                else:
-                    return "Unknown correspondent"
+        return await self.get_name(
+            "correspondent", correspondent_id, "Unknown correspondent"
+        )
 
     async def get_document_type_name(self, document_type_id: int) -> str:
         if document_type_id is None:
             return "No document type"
-        url = urljoin(self.base_url, f"api/document_types/{document_type_id}/")
-        headers = {"Authorization": f"Token {self.token}"}
+        return await self.get_name(
+            "document_type", document_type_id, "Unknown document type"
+        )
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limit on concurrent requests to one Paperless server. Every answer that
+    is neither an overload (429/5xx, timeout) nor slower than SLOW_FACTOR times the
+    usual latency adds 1/limit, about one slot per round of requests; anything else
+    halves the limit, at most once per usual round trip.
+    """
+
+    SLOW_FACTOR = 3.0
+
+    def __init__(self, maximum=16, initial=4, minimum=1):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = float(min(initial, maximum))
+        self.in_flight = 0
+        self.latency = None
+        self.last_decrease = 0.0
+        self.waiters = []
+        self.loop = None
+
+    def configure(self, maximum):
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(self.limit, self.maximum)
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # Requests and waiters of another (finished) loop can never release.
+            self.loop = loop
+            self.in_flight = 0
+            self.waiters = []
+        while self.in_flight >= int(self.limit):
+            waiter = loop.create_future()
+            self.waiters.append(waiter)
+            await waiter
+        self.in_flight += 1
+
+    def release(self, latency, overloaded=False):
+        self.in_flight = max(0, self.in_flight - 1)
+        now = time.monotonic()
+        slow = self.latency is not None and latency > self.SLOW_FACTOR * self.latency
+        if overloaded or slow:
+            if now - self.last_decrease > (self.latency or latency):
+                self.limit = max(self.minimum, self.limit / 2)
+                self.last_decrease = now
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        if not overloaded:
+            self.latency = (
+                latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            )
+        waiters, self.waiters = self.waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+def match_ids(names: Dict[int, str], wanted: str, label: str) -> List[int]:
+    wanted = wanted.strip().lower()
+    exact = [item_id for item_id, name in names.items() if name.lower() == wanted]
+    ids = exact or [
+        item_id for item_id, name in names.items() if wanted in name.lower()
+    ]
+    if not ids:
+        raise ValueError(f"No {label} matching '{wanted}' in Paperless")
+    return ids
+
+
+def date_range(value: str):
+    """First and last day of a YYYY, YYYY-MM or YYYY-MM-DD value."""
+    try:
+        parts = [int(part) for part in value.strip().split("-")]
+        if len(parts) == 1:
+            return date(parts[0], 1, 1), date(parts[0], 12, 31)
+        if len(parts) == 2:
+            last_day = calendar.monthrange(parts[0], parts[1])[1]
+            return date(parts[0], parts[1], 1), date(parts[0], parts[1], last_day)
+        day = date(*parts)
+        return day, day
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid date '{value}', use YYYY, YYYY-MM or YYYY-MM-DD")
+
+
+def user_credentials(valves, user: dict = None):
+    user = user or {}
+    user_valves = user.get("valves")
+    token = getattr(user_valves, "PAPERLESS_TOKEN", "")
+    if token:
+        base_url = getattr(user_valves, "PAPERLESS_URL", "") or valves.PAPERLESS_URL
+    else:
+        # The shared token is only ever sent to the admin-configured instance.
+        if user.get("id") and not valves.ALLOW_SHARED_TOKEN:
+            raise ValueError("Set your Paperless token in the tool's user valves")
+        base_url = valves.PAPERLESS_URL
+        token = valves.PAPERLESS_TOKEN
+    return base_url, token, (user.get("id", ""), base_url, token)
+
+
+class PaperlessUser:
+    """
+    aiohttp session and cached tag, correspondent and document type names for one
+    user's Paperless account.
+    """
+
+    MAX_NAMES = 2000
+    closing = set()
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data.get("name", "Unknown document type")
+    def __init__(self):
+        self.session = None
+        self.loop = None
+        self.names = {}
+        self.active = 0
+        self.last_used = time.monotonic()
+
+    def client(self):
+        # Sessions belong to the event loop they were created on.
+        loop = asyncio.get_running_loop()
+        if self.session is None or self.session.closed or self.loop is not loop:
+            self.session = aiohttp.ClientSession()
+            self.loop = loop
+        return self.session
+
+    def cached(self, key):
+        entry = self.names.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def remember(self, key, value, ttl):
+        if ttl <= 0:
+            return
+        self.names.pop(key, None)
+        self.names[key] = (time.monotonic() + ttl, value)
+        while len(self.names) > self.MAX_NAMES:
+            self.names.pop(next(iter(self.names)))
+
+    def close(self):
+        if self.session is None or self.session.closed or self.loop.is_closed():
+            return None
+        task = self.loop.create_task(self.session.close())
+        self.closing.add(task)
+        task.add_done_callback(self.closing.discard)
+        return task
+
+
+class UserRegistry:
+    """
+    Per-user state keyed by user id and credentials, so users never share a
+    session or cache. Users idle for longer than idle_timeout are dropped, as are
+    the least recently used ones beyond max_users; state a running call holds is
+    never dropped.
+    """
+
+    def __init__(self, factory, idle_timeout=900, max_users=200):
+        self.factory = factory
+        self.idle_timeout = idle_timeout
+        self.max_users = max_users
+        self.lock = threading.Lock()
+        self.states = {}
+
+    def configure(self, idle_timeout, max_users):
+        self.idle_timeout = idle_timeout
+        self.max_users = max(1, max_users)
+
+    @contextlib.contextmanager
+    def use(self, key):
+        with self.lock:
+            state = self.states.pop(key, None)
+            if state is None:
+                state = self.factory()
+            state.active += 1
+            self.states[key] = state
+            evicted = self.evict(time.monotonic())
+        for old in evicted:
+            old.close()
+        try:
+            yield state
+        finally:
+            with self.lock:
+                state.active -= 1
+                state.last_used = time.monotonic()
+
+    def keys(self):
+        with self.lock:
+            return list(self.states)
+
+    def close(self):
+        with self.lock:
+            states, self.states = list(self.states.values()), {}
+        return [state.close() for state in states]
+
+    def evict(self, now):
+        evicted = []
+        for key, state in list(self.states.items()):
+            if state.active:
+                continue
+            idle = now - state.last_used > self.idle_timeout
+            if idle or len(self.states) > self.max_users:
+                evicted.append(self.states.pop(key))
+        return evicted
+
+
+class ToolMetrics:
+    """
+    Stage timings, request/byte counts and optional cProfile or tracemalloc capture
+    for one tool call, reported as a structured log record and optionally as a
+    final status event. When disabled every hook is a no-op.
+    """
+
+    NO_STAGE = contextlib.nullcontext()
+    # tracemalloc and cProfile are process-wide: tracing runs while any call asks
+    # for it, and only one call at a time holds the profiler; others skip it.
+    capture_lock = threading.Lock()
+    tracing_calls = 0
+    owns_tracing = False
+    profiling = False
+
+    def __init__(self, method, enabled=False, profiler="", status_event=False):
+        self.method = method
+        self.enabled = enabled
+        self.status_event = enabled and status_event
+        if not enabled:
+            return
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.requests = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self.profiler = profiler.lower()
+        self.profile = None
+        self.tracing = False
+        self.finished = False
+        if self.profiler == "cprofile":
+            self.profile = self.start_profile()
+        elif self.profiler == "tracemalloc":
+            self.tracing = self.start_tracing()
+
+    @classmethod
+    def start_profile(cls):
+        # Profiles the event loop thread only; worker threads are not traced.
+        import cProfile
+
+        with cls.capture_lock:
+            if cls.profiling:
+                return None
+            cls.profiling = True
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (a debugger, say) is already active.
+            with cls.capture_lock:
+                cls.profiling = False
+            return None
+        return profile
+
+    @classmethod
+    def start_tracing(cls):
+        import tracemalloc
+
+        with cls.capture_lock:
+            if cls.tracing_calls == 0:
+                if tracemalloc.is_tracing():
+                    tracemalloc.reset_peak()
                 else:
-                    return "Unknown document type"
+                    tracemalloc.start()
+                    cls.owns_tracing = True
+            cls.tracing_calls += 1
+        return True
+
+    @classmethod
+    def for_call(cls, method, valves):
+        return cls(
+            method,
+            valves.METRICS_ENABLED,
+            valves.METRICS_PROFILER,
+            valves.METRICS_STATUS_EVENT,
+        )
+
+    def stage(self, name):
+        if not self.enabled:
+            return self.NO_STAGE
+        return self.timed(name)
+
+    @contextlib.contextmanager
+    def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def count(self, requests=0, bytes=0):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.requests += requests
+            self.bytes += bytes
+
+    def finish(self):
+        # Metrics must never fail the tool call they measure. Tool methods also call
+        # this from `finally`, so cancelled calls release their capture too.
+        if not self.enabled or self.finished:
+            return None
+        self.finished = True
+        try:
+            return self.summarize()
+        except Exception as e:
+            logger.warning(f"{self.method} metrics failed: {e}")
+            return None
+        finally:
+            self.release()
+
+    def summarize(self):
+        summary = {
+            "tool": self.method,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "stages_ms": {k: round(v * 1000, 1) for k, v in self.stages.items()},
+            "requests": self.requests,
+            "bytes": self.bytes,
+        }
+        if self.profile is not None:
+            import io
+            import pstats
+
+            self.profile.disable()
+            output = io.StringIO()
+            pstats.Stats(self.profile, stream=output).sort_stats(
+                "cumulative"
+            ).print_stats(15)
+            summary["profile"] = output.getvalue()
+        elif self.tracing:
+            import tracemalloc
+
+            # Overlapping calls share one trace, so the peak covers them all.
+            with self.capture_lock:
+                summary["peak_kib"] = round(
+                    tracemalloc.get_traced_memory()[1] / 1024, 1
+                )
+                top = tracemalloc.take_snapshot().statistics("lineno")[:10]
+            summary["allocations"] = [str(stat) for stat in top]
+        logger.info(
+            "%s metrics: %s",
+            self.method,
+            json.dumps({k: v for k, v in summary.items() if k != "profile"}),
+            extra={"tool_metrics": summary},
+        )
+        if "profile" in summary:
+            logger.info("%s profile:\n%s", self.method, summary["profile"])
+        return summary
+
+    def release(self):
+        cls = type(self)
+        with cls.capture_lock:
+            if self.profile is not None:
+                self.profile.disable()
+                cls.profiling = False
+            if self.tracing:
+                cls.tracing_calls -= 1
+                if cls.tracing_calls == 0 and cls.owns_tracing:
+                    import tracemalloc
+
+                    tracemalloc.stop()
+                    cls.owns_tracing = False
+
+    def describe(self, summary):
+        stages = ", ".join(f"{k} {v:.0f} ms" for k, v in summary["stages_ms"].items())
+        return (
+            f"{self.method} took {summary['total_ms']:.0f} ms ({stages}), "
+            f"{summary['requests']} requests, {summary['bytes'] / 1024:.0f} KiB"
+        )
+
+    async def report(self, event_emitter=None):
+        summary = self.finish()
+        if summary and self.status_event and event_emitter:
+            await event_emitter(
+                {
+                    "type": "status",
+                    "data": {
+                        "status": "complete",
+                        "description": self.describe(summary),
+                        "done": True,
+                    },
+                }
+            )
+
+
+NO_METRICS = ToolMetrics("none")
 
 
 class EventEmitter:
@@ -177,75 +750,183 @@ class Tools:
             default="",
             description="The token to read docs from paperless",
         )
+        MAX_CONCURRENT_REQUESTS: int = Field(
+            default=16,
+            description="Upper bound for concurrent requests to one Paperless server. The limit in use adapts below it to the server's latency and 429/5xx answers",
+        )
+        REQUEST_TIMEOUT: float = Field(
+            default=10.0,
+            description="Seconds to wait for a single Paperless request",
+        )
+        REQUEST_ATTEMPTS: int = Field(
+            default=3,
+            description="Attempts per request when Paperless times out or answers 429/5xx",
+        )
+        SEARCH_DEADLINE: float = Field(
+            default=30.0,
+            description="Overall seconds for one search, including retries",
+        )
+        METADATA_CACHE_TTL: int = Field(
+            default=300,
+            description="Seconds to reuse a user's tag, correspondent and document type names. 0 fetches them every call",
+        )
+        ALLOW_SHARED_TOKEN: bool = Field(
+            default=True,
+            description="Use PAPERLESS_TOKEN for users who have not set their own token",
+        )
+        USER_IDLE_TIMEOUT: int = Field(
+            default=900,
+            description="Seconds after which an inactive user's session and cache are dropped",
+        )
+        MAX_ACTIVE_USERS: int = Field(
+            default=200,
+            description="Users whose session and cache are kept at once; the least recently active are dropped first",
+        )
+        METRICS_ENABLED: bool = Field(
+            default=False,
+            description="Record per-stage timings, request counts and bytes for each call and log them",
+        )
+        METRICS_PROFILER: str = Field(
+            default="",
+            description="Extra capture while metrics are enabled: cprofile, tracemalloc or empty for none",
+        )
+        METRICS_STATUS_EVENT: bool = Field(
+            default=False,
+            description="Also show the recorded timings as a final status message",
+        )
+
+    class UserValves(BaseModel):
+        PAPERLESS_URL: str = Field(
+            default="",
+            description="Your paperless service, if it differs from the default one. Used together with your own token",
+        )
+        PAPERLESS_TOKEN: str = Field(
+            default="",
+            description="Your personal token to read docs from paperless",
+        )
 
     def __init__(self):
         self.valves = self.Valves()
+        self.users = UserRegistry(PaperlessUser)
+        self.limiters = {}
 
     async def search_paperless_documents(
         self,
         query: str,
+        correspondent: str = "",
+        document_type: str = "",
+        tags: str = "",
+        created_from: str = "",
+        created_to: str = "",
         __event_emitter__: Callable[[dict], Any] = None,
+        __user__: dict = None,
     ) -> str:
         """
-        Search for paperless documents using a query string.
-
-        :param query: The search query to find relevant documents.
+        Search for paperless documents using a query string and optional filters.
+        Use the filters whenever the user names a sender, a kind of document, a tag or a time period.
+
+        :param query: The search query to find relevant documents. May be empty when filters are given.
+        :param correspondent: Only documents from this correspondent (sender), e.g. "ACME".
+        :param document_type: Only documents of this type, e.g. "Invoice".
+        :param tags: Comma-separated tag names; documents with any of these tags match.
+        :param created_from: Earliest creation date as YYYY, YYYY-MM or YYYY-MM-DD.
+        :param created_to: Latest creation date as YYYY, YYYY-MM or YYYY-MM-DD.
         :return: A formatted string containing document summaries or an error message.
         """
         emitter = EventEmitter(__event_emitter__)
+        metrics = ToolMetrics.for_call("search_paperless_documents", self.valves)
+        deadline = time.monotonic() + self.valves.SEARCH_DEADLINE
 
         try:
             await emitter.emit(f"Searching documents for: {query}")
 
-            loader = PaperlessDocumentLoader(
-                base_url=self.valves.PAPERLESS_URL,
-                token=self.valves.PAPERLESS_TOKEN,
-                query=query,
+            base_url, token, user_key = user_credentials(self.valves, __user__)
+            self.users.configure(
+                self.valves.USER_IDLE_TIMEOUT, self.valves.MAX_ACTIVE_USERS
             )
-            documents = await loader.load()
-
-            if len(documents) == 0:
-                error_message = f"Query returned 0 documents for: {query}"
-                await emitter.emit(error_message, "error", True)
-                return error_message
-
-            # Fetch tag names for all documents
-            all_tag_ids = list(
-                set(tag_id for doc in documents for tag_id in doc["tags"])
-            )
-            tag_dict = await loader.get_tag_names(all_tag_ids)
-
-            # Add tag names, correspondent names, and document type names to documents
-            for doc in documents:
-                doc["tag_names"] = [
-                    tag_dict.get(tag_id, f"Unknown tag ({tag_id})")
-                    for tag_id in doc["tags"]
-                ]
-                doc["correspondent_name"] = await loader.get_correspondent_name(
-                    doc["correspondent"]
-                )
-                doc["document_type_name"] = await loader.get_document_type_name(
-                    doc["document_type"]
+            with self.users.use(user_key) as user:
+                # One limiter per server, shared by every user of that server and
+                # dropped once the registry holds no user of that server.
+                servers = {key[1] for key in self.users.keys()}
+                for url in self.limiters.keys() - servers:
+                    del self.limiters[url]
+                limiter = self.limiters.setdefault(base_url, AdaptiveLimiter())
+                limiter.configure(self.valves.MAX_CONCURRENT_REQUESTS)
+                loader = PaperlessDocumentLoader(
+                    base_url=base_url,
+                    token=token,
+                    query=query,
+                    metrics=metrics,
+                    user=user,
+                    cache_ttl=self.valves.METADATA_CACHE_TTL,
+                    limiter=limiter,
+                    deadline=deadline,
+                    request_timeout=self.valves.REQUEST_TIMEOUT,
+                    attempts=self.valves.REQUEST_ATTEMPTS,
                 )
+                with metrics.stage("fetch"):
+                    filters = await loader.build_filters(
+                        correspondent, document_type, tags, created_from, created_to
+                    )
+                    documents = await loader.load(filters)
+
+                if len(documents) == 0:
+                    error_message = f"Query returned 0 documents for: {query}"
+                    await emitter.emit(error_message, "error", True)
+                    await metrics.report(__event_emitter__)
+                    return error_message
+
+                with metrics.stage("enrich"):
+                    # Fetch tag names for all documents
+                    all_tag_ids = list(
+                        set(tag_id for doc in documents for tag_id in doc["tags"])
+                    )
+                    correspondent_ids = list(
+                        {doc["correspondent"] for doc in documents}
+                    )
+                    document_type_ids = list(
+                        {doc["document_type"] for doc in documents}
+                    )
+                    # Lookups run concurrently; the limiter keeps them within what
+                    # the server currently handles.
+                    tag_dict, *names = await asyncio.gather(
+                        loader.get_tag_names(all_tag_ids),
+                        *map(loader.get_correspondent_name, correspondent_ids),
+                        *map(loader.get_document_type_name, document_type_ids),
+                    )
+                    correspondents = dict(zip(correspondent_ids, names))
+                    document_types = dict(
+                        zip(document_type_ids, names[len(correspondent_ids) :])
+                    )
 
-            # Format the documents for better readability
-            formatted_documents = []
-            for doc in documents:
-                formatted_doc = (
-                    f"Document ID: {doc['id']}\n"
-                    f"Title: {doc['title']}\n"
-                    f"Content Preview: {doc['content'][:100]}...\n"
-                    f"Tags: {', '.join(doc['tag_names'])}\n"
-                    f"Correspondent: {doc['correspondent_name']}\n"
-                    f"Document Type: {doc['document_type_name']}\n"
-                    f"Created: {doc['created']}\n"
-                    f"Original File Name: {doc['original_file_name']}\n"
-                    f"---\n"
-                )
-                formatted_documents.append(formatted_doc)
+                    # Add tag names, correspondent names, and document type names to documents
+                    for doc in documents:
+                        doc["tag_names"] = [
+                            tag_dict.get(tag_id, f"Unknown tag ({tag_id})")
+                            for tag_id in doc["tags"]
+                        ]
+                        doc["correspondent_name"] = correspondents[doc["correspondent"]]
+                        doc["document_type_name"] = document_types[doc["document_type"]]
+
+            with metrics.stage("format"):
+                # Format the documents for better readability
+                formatted_documents = []
+                for doc in documents:
+                    formatted_doc = (
+                        f"Document ID: {doc['id']}\n"
+                        f"Title: {doc['title']}\n"
+                        f"Content Preview: {doc['content'][:100]}...\n"
+                        f"Tags: {', '.join(doc['tag_names'])}\n"
+                        f"Correspondent: {doc['correspondent_name']}\n"
+                        f"Document Type: {doc['document_type_name']}\n"
+                        f"Created: {doc['created']}\n"
+                        f"Original File Name: {doc['original_file_name']}\n"
+                        f"---\n"
+                    )
+                    formatted_documents.append(formatted_doc)
 
-            result = f"Found {len(documents)} documents for query: {query}\n\n"
-            result += "\n".join(formatted_documents)
+                result = f"Found {len(documents)} documents for query: {query}\n\n"
+                result += "\n".join(formatted_documents)
 
             await emitter.emit(
                 f"Retrieved {len(documents)} documents for query: {query}",
@@ -266,15 +947,17 @@ class Tools:
                                     "document_count": len(documents),
                                 }
                             ],
-                            "source": {
-                                "name": f"{self.valves.PAPERLESS_URL}api/documents/"
-                            },
+                            "source": {"name": f"{base_url}api/documents/"},
                         },
                     }
                 )
 
+            await metrics.report(__event_emitter__)
             return result
         except Exception as e:
             error_message = f"Error: {str(e)}"
             await emitter.emit(error_message, "error", True)
+            await metrics.report(__event_emitter__)
             return error_message
+        finally:
+            metrics.finish()
@@ -15,20 +15,67 @@ In this example a self-hosted SearxNG instance is used.
 """
 
 import os
-import requests
-from datetime import datetime
+import codecs
+import contextlib
+import importlib
+import logging
 import json
-from requests import get
-from bs4 import BeautifulSoup
+import heapq
+import math
+from collections import Counter
+import tempfile
+import time
+from contextlib import closing
 import concurrent.futures
+import threading
 from html.parser import HTMLParser
-from urllib.parse import urlparse, urljoin
+from urllib.parse import urlparse, urljoin, parse_qsl, urlencode, urlunparse
 import re
 import unicodedata
 from pydantic import BaseModel, Field
 import asyncio
 from typing import Callable, Any
 
+logger = logging.getLogger(__name__)
+
+
+class LazyImport:
+    """
+    Stands in for a module and imports it on first attribute access, so loading
+    the tool does not pay for dependencies until a call needs them.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+requests = LazyImport("requests")
+sqlite3 = LazyImport("sqlite3")
+multiprocessing = LazyImport("multiprocessing")
+
+TEXT_CONTENT_TYPES = {"text/html", "application/xhtml+xml", "text/plain"}
+
+
+class UnsupportedPage(Exception):
+    pass
+
+
+TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref", "ref_src"}
+
+# fmt: off
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how",
+    "in", "is", "it", "of", "on", "or", "that", "the", "to", "was", "what",
+    "when", "where", "which", "who", "why", "with",
+}
+# fmt: on
+
 
 class HelpFunctions:
     def __init__(self):
@@ -39,46 +86,244 @@ class HelpFunctions:
         base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
         return base_url
 
+    def canonical_url(self, url):
+        # Same page under a different scheme, "www.", fragment, trailing slash or
+        # tracking parameters maps to one key.
+        parsed = urlparse(url.strip())
+        host = (parsed.hostname or "").lower()
+        if host.startswith("www."):
+            host = host[4:]
+        if parsed.port and parsed.port not in (80, 443):
+            host = f"{host}:{parsed.port}"
+        query = sorted(
+            (key, value)
+            for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+            if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+        )
+        path = parsed.path.rstrip("/") or "/"
+        return urlunparse(("", host, path, "", urlencode(query), ""))
+
     def generate_excerpt(self, content, max_length=200):
         return content[:max_length] + "..." if len(content) > max_length else content
 
+    _cleanup_patterns = None
+
+    @classmethod
+    def cleanup_patterns(cls):
+        # Built once per process: a character class of every "So" (symbol/emoji)
+        # code point, none of which sit above U+1FFFF, plus a whitespace collapser.
+        if cls._cleanup_patterns is None:
+            ranges = []
+            start = None
+            for code_point in range(0x20001):
+                is_symbol = (
+                    code_point < 0x20000
+                    and unicodedata.category(chr(code_point)) == "So"
+                )
+                if is_symbol and start is None:
+                    start = code_point
+                elif not is_symbol and start is not None:
+                    ranges.append(
+                        f"{re.escape(chr(start))}-{re.escape(chr(code_point - 1))}"
+                    )
+                    start = None
+            cls._cleanup_patterns = (
+                re.compile("[" + "".join(ranges) + "]+"),
+                re.compile(r"\s+"),
+            )
+        return cls._cleanup_patterns
+
     def format_text(self, original_text):
-        soup = BeautifulSoup(original_text, "html.parser")
-        formatted_text = soup.get_text(separator=" ", strip=True)
-        formatted_text = unicodedata.normalize("NFKC", formatted_text)
-        formatted_text = re.sub(r"\s+", " ", formatted_text)
-        formatted_text = formatted_text.strip()
-        formatted_text = self.remove_emojis(formatted_text)
-        return formatted_text
+        symbols, whitespace = self.cleanup_patterns()
+        formatted_text = unicodedata.normalize("NFKC", original_text)
+        formatted_text = symbols.sub("", formatted_text)
+        return whitespace.sub(" ", formatted_text).strip()
 
     def remove_emojis(self, text):
-        return "".join(c for c in text if not unicodedata.category(c).startswith("So"))
+        symbols, _ = self.cleanup_patterns()
+        return symbols.sub("", text)
 
-    def process_search_result(self, result, valves):
-        title_site = self.remove_emojis(result["title"])
-        url_site = result["url"]
-        snippet = result.get("content", "")
+    def fetch_page(
+        self,
+        url,
+        timeout,
+        max_bytes,
+        max_words,
+        cancel_event=None,
+        headers=None,
+        skip_oversized=False,
+        cache=None,
+        hosts=None,
+        pool=None,
+        metrics=None,
+    ):
+        metrics = metrics or NO_METRICS
+        cached = cache.get(url, max_words) if cache else None
+        if cached and cache.is_fresh(cached):
+            return cached
+
+        request_headers = dict(headers or {})
+        if cached:
+            if cached.etag:
+                request_headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                request_headers["If-Modified-Since"] = cached.last_modified
 
-        # Check if the website is in the ignored list, but only if IGNORED_WEBSITES is not empty
-        if valves.IGNORED_WEBSITES:
-            base_url = self.get_base_url(url_site)
-            if any(
-                ignored_site.strip() in base_url
-                for ignored_site in valves.IGNORED_WEBSITES.split(",")
-            ):
+        host = urlparse(url).hostname or ""
+        if hosts is not None:
+            if not hosts.acquire(host, cancel_event):
                 return None
+            timeout = hosts.timeout_for(host, timeout)
 
         try:
-            response_site = requests.get(url_site, timeout=20)
-            response_site.raise_for_status()
-            html_content = response_site.text
+            with metrics.stage("fetch"), requests.get(
+                url, headers=request_headers, timeout=timeout, stream=True
+            ) as response:
+                metrics.count(requests=1)
+                if hosts is not None:
+                    hosts.record_response(
+                        host, response.elapsed.total_seconds(), response.status_code
+                    )
+                if cached and response.status_code == 304:
+                    cache.revalidated(url)
+                    return cached
+                response.raise_for_status()
+                page = self.read_page(
+                    response,
+                    max_bytes,
+                    max_words,
+                    cancel_event,
+                    skip_oversized,
+                    pool,
+                    metrics,
+                )
+                if page is not None and cache:
+                    cache.put(
+                        url,
+                        page,
+                        response.headers.get("ETag"),
+                        response.headers.get("Last-Modified"),
+                    )
+                return page
+        except requests.exceptions.RequestException as e:
+            if hosts is not None:
+                hosts.record_failure(host, e)
+            raise
+        finally:
+            if hosts is not None:
+                hosts.release(host)
+
+    def read_page(
+        self,
+        response,
+        max_bytes,
+        max_words,
+        cancel_event=None,
+        skip_oversized=False,
+        pool=None,
+        metrics=None,
+    ):
+        # Without a pool the body is streamed into an incremental parser, so the
+        # page is decoded and parsed once as it arrives. Reading stops once enough
+        # words are in, the byte cap is hit, or the scheduler cancels the fetch.
+        content_type = response.headers.get("Content-Type", "").lower()
+        mime_type = content_type.split(";")[0].strip()
+        if mime_type and mime_type not in TEXT_CONTENT_TYPES:
+            raise UnsupportedPage(f"Unsupported content type: {mime_type}")
+        content_length = response.headers.get("Content-Length", "")
+        if (
+            skip_oversized
+            and content_length.isdigit()
+            and int(content_length) > max_bytes
+        ):
+            raise UnsupportedPage(f"Page too large: {content_length} bytes")
+
+        encoding = "utf-8"
+        if "charset" in content_type:
+            encoding = response.encoding or encoding
+
+        if pool is not None:
+            # Download first, then hand the raw bytes to the extraction pool.
+            raw = bytearray()
+            for chunk in response.iter_content(chunk_size=16384):
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+                raw.extend(chunk[: max_bytes - len(raw)])
+                if len(raw) >= max_bytes:
+                    break
+            metrics = metrics or NO_METRICS
+            metrics.count(bytes=len(raw))
+            with metrics.stage("parse"):
+                try:
+                    return PageText(
+                        *pool.submit(
+                            extract_page_text, bytes(raw), encoding, max_words
+                        ).result()
+                    )
+                except (concurrent.futures.BrokenExecutor, RuntimeError) as e:
+                    # RuntimeError: another thread already shut the broken pool down.
+                    logger.warning(f"Extraction pool broke ({e}), parsing inline")
+                    ExtractionPools.discard(pool)
+                    return PageText(*extract_page_text(bytes(raw), encoding, max_words))
+
+        page = TextExtractor()
+        decoder = text_decoder(encoding)
+        bytes_read = 0
+        for chunk in response.iter_content(chunk_size=16384):
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            chunk = chunk[: max_bytes - bytes_read]
+            bytes_read += len(chunk)
+            page.feed(decoder.decode(chunk))
+            # Only the word limit marks the page truncated: the cache refetches
+            # such pages for a larger limit, which can't help a byte-capped one.
+            if page.word_count >= max_words:
+                page.truncated = True
+                break
+            if bytes_read >= max_bytes:
+                break
+        page.feed(decoder.decode(b"", final=True))
+        page.close()
+        (metrics or NO_METRICS).count(bytes=bytes_read)
+        return page
 
-            soup = BeautifulSoup(html_content, "html.parser")
-            content_site = self.format_text(soup.get_text(separator=" ", strip=True))
+    def process_search_result(
+        self,
+        result,
+        valves,
+        cancel_event=None,
+        cache=None,
+        hosts=None,
+        pool=None,
+        metrics=None,
+    ):
+        metrics = metrics or NO_METRICS
+        title_site = self.remove_emojis(result["title"])
+        url_site = result["url"]
+        snippet = result.get("content", "")
 
-            truncated_content = self.truncate_to_n_words(
-                content_site, valves.PAGE_CONTENT_WORDS_LIMIT
+        try:
+            page = self.fetch_page(
+                url_site,
+                min(20, valves.SEARCH_TIMEOUT),
+                valves.MAX_PAGE_BYTES,
+                valves.PAGE_CONTENT_WORDS_LIMIT,
+                cancel_event,
+                skip_oversized=True,
+                cache=cache,
+                hosts=hosts,
+                pool=pool,
+                metrics=metrics,
             )
+            if page is None:
+                return None
+
+            with metrics.stage("format"):
+                content_site = self.format_text(page.text)
+
+                truncated_content = self.truncate_to_n_words(
+                    content_site, valves.PAGE_CONTENT_WORDS_LIMIT
+                )
 
             return {
                 "title": title_site,
@@ -87,7 +332,7 @@ class HelpFunctions:
                 "snippet": self.remove_emojis(snippet),
             }
 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, UnsupportedPage):
             return None
 
     def truncate_to_n_words(self, text, token_limit):
@@ -96,6 +341,1002 @@ class HelpFunctions:
         return " ".join(truncated_tokens)
 
 
+class TextExtractor(HTMLParser):
+    """
+    Incremental HTML-to-text parser. Feed it decoded chunks as they arrive, then
+    read `title` and `text` after close(). Text inside script, style and
+    navigation boilerplate is dropped.
+    """
+
+    SKIPPED_TAGS = {
+        "script",
+        "style",
+        "noscript",
+        "template",
+        "svg",
+        "nav",
+        "footer",
+        "aside",
+    }
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.parts = []
+        self.skip_depth = 0
+        self.in_title = False
+        self.word_count = 0
+        self.truncated = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif tag == "title" and not self.skip_depth and not self.title:
+            # Only the document's first title counts; inline SVG icons have
+            # <title> elements of their own.
+            self.in_title = True
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS:
+            if self.skip_depth:
+                self.skip_depth -= 1
+        elif tag == "title":
+            self.in_title = False
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title += data
+        if not self.skip_depth:
+            self.parts.append(data)
+            self.word_count += len(data.split())
+
+    @property
+    def text(self):
+        return " ".join(self.parts)
+
+
+def text_decoder(encoding):
+    try:
+        return codecs.getincrementaldecoder(encoding)(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+def extract_page_text(raw, encoding, max_words):
+    # Runs inside extraction pool workers: raw bytes in, a compact tuple out.
+    page = TextExtractor()
+    decoder = text_decoder(encoding)
+    for start in range(0, len(raw), 65536):
+        page.feed(decoder.decode(raw[start : start + 65536]))
+        if page.word_count >= max_words:
+            page.truncated = True
+            break
+    page.feed(decoder.decode(b"", final=True))
+    page.close()
+    return page.title, page.text, page.word_count, page.truncated
+
+
+def read_tool_source():
+    path = globals().get("__file__")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except (TypeError, OSError):
+        return None
+
+
+# Process workers rebuild this module from its source (see ExtractionPools), and
+# OpenWebUI deletes the file it loads a tool from once the import is done.
+TOOL_SOURCE = read_tool_source()
+
+WORKER_BOOTSTRAP = """
+import sys, types
+module = types.ModuleType(name)
+module.__file__ = None
+sys.modules[name] = module
+exec(compile(source, name, "exec"), module.__dict__)
+module.HelpFunctions.cleanup_patterns()
+"""
+
+
+class ExtractionPools:
+    """
+    Shared, reusable worker pools for HTML extraction, one per (mode, size).
+    Process workers are started with forkserver (or spawn), never forked from the
+    multi-threaded host, where a lock held by another thread at fork time can
+    deadlock a worker. Each one registers the tool module under its own name from
+    TOOL_SOURCE, so extraction calls pickle by reference as usual. Workers are
+    started up front so the first search pays no start-up cost. Without the
+    source, process mode falls back to threads. A pool that broke (a worker was
+    killed) is dropped and rebuilt on next use.
+    """
+
+    pools = {}
+    lock = threading.Lock()
+
+    @classmethod
+    def get(cls, mode, workers):
+        if mode not in ("thread", "process"):
+            return None
+        if mode == "process" and TOOL_SOURCE is None:
+            logger.warning("Tool source unavailable, extracting in threads instead")
+            mode = "thread"
+        workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        with cls.lock:
+            pool = cls.pools.get((mode, workers))
+            if pool is None:
+                if mode == "process":
+                    methods = multiprocessing.get_all_start_methods()
+                    pool = concurrent.futures.ProcessPoolExecutor(
+                        max_workers=workers,
+                        mp_context=multiprocessing.get_context(
+                            "forkserver" if "forkserver" in methods else "spawn"
+                        ),
+                        initializer=exec,
+                        initargs=(
+                            WORKER_BOOTSTRAP,
+                            {"name": __name__, "source": TOOL_SOURCE},
+                        ),
+                    )
+                    for _ in range(workers):
+                        pool.submit(int)
+                else:
+                    pool = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=workers, thread_name_prefix="html-extract"
+                    )
+                cls.pools[(mode, workers)] = pool
+            return pool
+
+    @classmethod
+    def discard(cls, pool):
+        with cls.lock:
+            for key, known in list(cls.pools.items()):
+                if known is pool:
+                    del cls.pools[key]
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class PageText:
+    def __init__(
+        self,
+        title,
+        text,
+        word_count,
+        truncated,
+        etag=None,
+        last_modified=None,
+        validated_at=None,
+    ):
+        self.title = title
+        self.text = text
+        self.word_count = word_count
+        self.truncated = truncated
+        self.etag = etag
+        self.last_modified = last_modified
+        self.validated_at = validated_at
+
+
+class HostTracker:
+    """
+    Per-host politeness and failure memory for the scraper, kept across searches.
+    Limits concurrent requests and spacing of request starts per host, stops using
+    a host for a cooldown once it failed failure_threshold times in a row, and
+    derives each host's timeout from its observed latency. Only failures that say
+    something about the whole host count: timeouts, refused or dropped
+    connections and 429/503 answers. Any other answer resets the count, since an
+    error on one page (404, 403, 500) says nothing about the host's other pages.
+    """
+
+    MIN_TIMEOUT = 3.0
+    LATENCY_FACTOR = 4.0
+    MAX_HOSTS = 1000
+    OVERLOAD_STATUSES = (429, 503)
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.hosts = {}
+        self.max_concurrent = 2
+        self.min_interval = 0.0
+        self.cooldown = 0
+        self.failure_threshold = 3
+
+    def configure(self, max_concurrent, min_interval, cooldown, failure_threshold=3):
+        self.max_concurrent = max(max_concurrent, 1)
+        self.min_interval = min_interval
+        self.cooldown = cooldown
+        self.failure_threshold = max(failure_threshold, 1)
+
+    def state(self, host):
+        state = self.hosts.get(host)
+        if state is None:
+            if len(self.hosts) >= self.MAX_HOSTS:
+                now = time.monotonic()
+                for idle in [
+                    h
+                    for h, s in self.hosts.items()
+                    if not s["in_flight"] and s["blocked_until"] < now
+                ]:
+                    del self.hosts[idle]
+            state = {
+                "in_flight": 0,
+                "next_start": 0.0,
+                "blocked_until": 0.0,
+                "failures": 0,
+                "latency": None,
+            }
+            self.hosts[host] = state
+        return state
+
+    def is_available(self, host):
+        with self.condition:
+            state = self.hosts.get(host)
+            return state is None or state["blocked_until"] <= time.monotonic()
+
+    def acquire(self, host, cancel_event=None):
+        with self.condition:
+            state = self.state(host)
+            while state["in_flight"] >= self.max_concurrent:
+                if cancel_event is not None and cancel_event.is_set():
+                    return False
+                self.condition.wait(0.5)
+            state["in_flight"] += 1
+            now = time.monotonic()
+            delay = state["next_start"] - now
+            state["next_start"] = max(now, state["next_start"]) + self.min_interval
+        if delay > 0 and cancel_event is not None and cancel_event.wait(delay):
+            self.release(host)
+            return False
+        if delay > 0 and cancel_event is None:
+            time.sleep(delay)
+        return True
+
+    def release(self, host):
+        with self.condition:
+            self.state(host)["in_flight"] -= 1
+            self.condition.notify_all()
+
+    def timeout_for(self, host, ceiling):
+        with self.condition:
+            latency = self.state(host)["latency"]
+        if latency is None:
+            return ceiling
+        return min(ceiling, max(self.MIN_TIMEOUT, latency * self.LATENCY_FACTOR))
+
+    def record_response(self, host, seconds, status):
+        with self.condition:
+            state = self.state(host)
+            if state["latency"] is None:
+                state["latency"] = seconds
+            else:
+                state["latency"] = 0.7 * state["latency"] + 0.3 * seconds
+            if status not in self.OVERLOAD_STATUSES:
+                state["failures"] = 0
+
+    def record_failure(self, host, error):
+        response = getattr(error, "response", None)
+        if response is not None:
+            if response.status_code not in self.OVERLOAD_STATUSES:
+                return
+        elif not isinstance(
+            error,
+            (requests.exceptions.Timeout, requests.exceptions.ConnectionError),
+        ):
+            return
+        with self.condition:
+            state = self.state(host)
+            state["failures"] += 1
+            if state["failures"] >= self.failure_threshold:
+                state["failures"] = 0
+                state["blocked_until"] = time.monotonic() + self.cooldown
+
+
+class PageCache:
+    """
+    On-disk (SQLite) cache of extracted page text keyed by URL. Entries younger
+    than the TTL are served without a request, older ones are revalidated with
+    their ETag / Last-Modified, and least recently used entries are evicted once
+    the stored text exceeds the size cap. The cache fails safe: a database that
+    cannot be opened, is locked or is full turns reads into misses and skips
+    writes.
+    """
+
+    def __init__(self, path, ttl, max_age, max_bytes):
+        self.path = path
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.ready = False
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=10)
+        if not self.ready:
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS pages ("
+                    "url TEXT PRIMARY KEY, title TEXT, text TEXT, word_count INTEGER, "
+                    "truncated INTEGER, etag TEXT, last_modified TEXT, "
+                    "validated_at REAL, used_at REAL, size INTEGER)"
+                )
+            self.ready = True
+        return connection
+
+    def get(self, url, max_words):
+        try:
+            return self.read(url, max_words)
+        except sqlite3.Error as e:
+            logger.warning(f"Page cache read failed for {url}: {e}")
+            return None
+
+    def read(self, url, max_words):
+        with closing(self.connect()) as connection:
+            row = connection.execute(
+                "SELECT title, text, word_count, truncated, etag, last_modified, "
+                "validated_at FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            page = PageText(*row)
+            expired = time.time() - page.validated_at > self.max_age
+            # A page cut short at a lower word limit can't answer a larger one;
+            # pages cut at the byte cap are not marked truncated.
+            too_short = page.truncated and page.word_count < max_words
+            with connection:
+                if expired or too_short:
+                    connection.execute("DELETE FROM pages WHERE url = ?", (url,))
+                    return None
+                connection.execute(
+                    "UPDATE pages SET used_at = ? WHERE url = ?", (time.time(), url)
+                )
+            return page
+
+    def is_fresh(self, page):
+        return time.time() - page.validated_at < self.ttl
+
+    def revalidated(self, url):
+        try:
+            with closing(self.connect()) as connection, connection:
+                connection.execute(
+                    "UPDATE pages SET validated_at = ? WHERE url = ?",
+                    (time.time(), url),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Page cache update failed for {url}: {e}")
+
+    def put(self, url, page, etag, last_modified):
+        try:
+            self.write(url, page, etag, last_modified)
+            self.evict()
+        except sqlite3.Error as e:
+            logger.warning(f"Page cache write failed for {url}: {e}")
+
+    def write(self, url, page, etag, last_modified):
+        text = page.text
+        now = time.time()
+        with closing(self.connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    page.title,
+                    text,
+                    page.word_count,
+                    int(page.truncated),
+                    etag,
+                    last_modified,
+                    now,
+                    now,
+                    len(text.encode("utf-8")) + len(page.title),
+                ),
+            )
+
+    def evict(self):
+        # One thread at a time trims the table down to 90% of the cap.
+        if not self.lock.acquire(blocking=False):
+            return
+        try:
+            with closing(self.connect()) as connection, connection:
+                total = connection.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM pages"
+                ).fetchone()[0]
+                if total <= self.max_bytes:
+                    return
+                stale = []
+                for url, size in connection.execute(
+                    "SELECT url, size FROM pages ORDER BY used_at"
+                ):
+                    if total <= self.max_bytes * 0.9:
+                        break
+                    stale.append((url,))
+                    total -= size
+                connection.executemany("DELETE FROM pages WHERE url = ?", stale)
+        finally:
+            self.lock.release()
+
+
+class NearDuplicateFilter:
+    """
+    Bottom-k MinHash sketches over word shingles. A page whose estimated Jaccard
+    similarity with an already kept page reaches the threshold is treated as a
+    mirror or syndicated copy and dropped.
+    """
+
+    SHINGLE_WORDS = 5
+    SKETCH_SIZE = 128
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.sketches = []
+
+    def sketch(self, text):
+        words = text.lower().split()
+        shingles = set(
+            map(hash, zip(*(words[i:] for i in range(self.SHINGLE_WORDS))))
+        ) or {hash(tuple(words))}
+        return set(heapq.nsmallest(self.SKETCH_SIZE, shingles))
+
+    def similarity(self, a, b):
+        union_sketch = heapq.nsmallest(self.SKETCH_SIZE, a | b)
+        shared = sum(1 for h in union_sketch if h in a and h in b)
+        return shared / len(union_sketch)
+
+    def add(self, text):
+        if self.threshold <= 0:
+            return True
+        sketch = self.sketch(text)
+        if any(
+            self.similarity(sketch, kept) >= self.threshold for kept in self.sketches
+        ):
+            return False
+        self.sketches.append(sketch)
+        return True
+
+
+class PassagePacker:
+    """
+    Splits scraped pages into passages of whole sentences, scores them against the
+    query with BM25 (term statistics taken over every passage retrieved for this
+    search) and fills one global word budget: every page first gets its best
+    passage, then the rest goes to the best remaining passages across pages, equal
+    scores taking turns between pages. Chosen passages are returned in page order,
+    joined with " ... "; pages without a chosen passage are dropped.
+    """
+
+    PASSAGE_WORDS = 80
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, query, budget):
+        terms = re.findall(r"\w+", query.lower())
+        self.terms = set(t for t in terms if t not in STOP_WORDS) or set(terms)
+        self.budget = budget
+
+    def split(self, text):
+        passages = []
+        current = []
+        for sentence in re.split(r"(?<=[.!?])\s+", text):
+            words = sentence.split()
+            while len(words) > self.PASSAGE_WORDS:
+                if current:
+                    passages.append(" ".join(current))
+                    current = []
+                passages.append(" ".join(words[: self.PASSAGE_WORDS]))
+                words = words[self.PASSAGE_WORDS :]
+            if current and len(current) + len(words) > self.PASSAGE_WORDS:
+                passages.append(" ".join(current))
+                current = []
+            current.extend(words)
+        if current:
+            passages.append(" ".join(current))
+        return passages
+
+    def pack(self, pages):
+        passages = []
+        for page_index, page in enumerate(pages):
+            for passage_index, passage in enumerate(self.split(page["content"])):
+                terms = Counter(
+                    t for t in re.findall(r"\w+", passage.lower()) if t in self.terms
+                )
+                passages.append(
+                    (page_index, passage_index, passage, len(passage.split()), terms)
+                )
+        if not passages:
+            return []
+
+        document_frequency = Counter(t for p in passages for t in p[4])
+        average_length = sum(p[3] for p in passages) / len(passages)
+        idf = {
+            t: math.log(1 + (len(passages) - df + 0.5) / (df + 0.5))
+            for t, df in document_frequency.items()
+        }
+
+        def score(passage):
+            length_norm = self.K1 * (1 - self.B + self.B * passage[3] / average_length)
+            return sum(
+                idf[t] * tf * (self.K1 + 1) / (tf + length_norm)
+                for t, tf in passage[4].items()
+            )
+
+        ranked = sorted(passages, key=lambda p: (-score(p), p[1], p[0]))
+        best = {}
+        for passage in ranked:
+            best.setdefault(passage[0], passage)
+        remaining = self.budget
+        chosen = {}
+        for passage in list(best.values()) + ranked:
+            if remaining <= 0:
+                break
+            if passage[3] <= remaining and passage[:2] not in chosen:
+                chosen[passage[:2]] = passage
+                remaining -= passage[3]
+
+        by_page = {}
+        for (page_index, _), passage in sorted(chosen.items()):
+            by_page.setdefault(page_index, []).append(passage[2])
+        return [
+            {**page, "content": " ... ".join(by_page[page_index])}
+            for page_index, page in enumerate(pages)
+            if page_index in by_page
+        ]
+
+
+class ScrapeScheduler:
+    """
+    Scrapes search results until enough pages succeed or the deadline passes.
+    Only the wanted number of fetches run at first; a failed or rejected fetch, or
+    no progress within the hedge delay, launches the next candidate. Once done,
+    queued fetches are dropped and running ones are told to stop instead of being
+    waited for.
+    """
+
+    # Shortest wait between passes, so a tiny hedge delay cannot spin the loop.
+    MIN_WAIT = 0.05
+
+    def __init__(self, wanted, time_budget, hedge_delay, max_in_flight):
+        self.wanted = wanted
+        self.time_budget = time_budget
+        self.hedge_delay = max(hedge_delay, self.MIN_WAIT)
+        self.max_in_flight = max(max_in_flight, 1)
+
+    async def run(self, candidates, process, accept=None):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.time_budget
+        cancel_event = threading.Event()
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_in_flight)
+        queue = list(candidates)
+        pending = set()
+        results = []
+        hedges = 0
+
+        def top_up():
+            target = min(self.wanted - len(results) + hedges, self.max_in_flight)
+            while queue and len(pending) < target:
+                candidate = queue.pop(0)
+                pending.add(
+                    loop.run_in_executor(executor, process, candidate, cancel_event)
+                )
+
+        try:
+            top_up()
+            while pending and len(results) < self.wanted:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=min(remaining, self.hedge_delay),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    hedges += 1
+                for future in done:
+                    try:
+                        result = future.result()
+                    except Exception:
+                        result = None
+                    if result and (accept is None or accept(result)):
+                        results.append(result)
+                top_up()
+        finally:
+            cancel_event.set()
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return results[: self.wanted]
+
+
+class UrlPolicy:
+    """
+    Compiled form of the IGNORED_WEBSITES valve, applied to the whole search result
+    list before pages are chosen for scraping. Entries with a dot block that domain
+    and its subdomains, bare names ("pinterest") block any host with that label.
+    Results are de-duplicated by canonical URL.
+    """
+
+    def __init__(self, ignored_websites):
+        self.domains = set()
+        self.labels = set()
+        for entry in ignored_websites.split(","):
+            entry = entry.strip().lower()
+            if "://" in entry:
+                entry = urlparse(entry).hostname or ""
+            entry = entry.split("/")[0]
+            if entry.startswith("www."):
+                entry = entry[4:]
+            if not entry:
+                continue
+            if "." in entry:
+                self.domains.add(entry)
+            else:
+                self.labels.add(entry)
+
+    def is_ignored(self, host):
+        labels = host.split(".")
+        if self.labels.intersection(labels):
+            return True
+        return any(".".join(labels[i:]) in self.domains for i in range(len(labels)))
+
+    def select(self, results, limit, host_available=None):
+        functions = HelpFunctions()
+        seen = set()
+        selected = []
+        for result in results:
+            url = result.get("url", "")
+            parsed = urlparse(url)
+            if parsed.scheme not in ("http", "https") or not parsed.hostname:
+                continue
+            if self.is_ignored(parsed.hostname.lower()):
+                continue
+            if host_available is not None and not host_available(parsed.hostname):
+                continue
+            key = functions.canonical_url(url)
+            if key in seen:
+                continue
+            seen.add(key)
+            selected.append(result)
+            if len(selected) >= limit:
+                break
+        return selected
+
+
+class SearchClient:
+    """
+    SearXNG client with a small in-memory TTL cache keyed by the normalized query
+    and request params. In fan-out mode several query variants are searched
+    concurrently and their result lists merged with reciprocal rank fusion.
+    """
+
+    RRF_K = 60
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def cache_key(self, url, query, params):
+        normalized = " ".join(query.lower().split())
+        return (url, normalized, tuple(sorted(params.items())))
+
+    def search(self, url, query, params, headers, ttl, metrics=None):
+        key = self.cache_key(url, query, params)
+        now = time.monotonic()
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached and cached[0] > now:
+                return cached[1]
+
+        resp = requests.get(
+            url, params={"q": query, **params}, headers=headers, timeout=120
+        )
+        (metrics or NO_METRICS).count(requests=1, bytes=len(resp.content))
+        resp.raise_for_status()
+        results = resp.json().get("results", [])
+
+        if ttl > 0:
+            with self.lock:
+                self.cache.pop(key, None)
+                self.cache[key] = (now + ttl, results)
+                while len(self.cache) > self.max_entries:
+                    self.cache.pop(next(iter(self.cache)))
+        return results
+
+    async def fan_out(self, url, queries, params, headers, ttl, metrics=None):
+        loop = asyncio.get_running_loop()
+        responses = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    None, self.search, url, query, params, headers, ttl, metrics
+                )
+                for query in queries
+            ),
+            return_exceptions=True,
+        )
+        result_lists = [r for r in responses if not isinstance(r, BaseException)]
+        if not result_lists:
+            raise responses[0]
+        if len(result_lists) == 1:
+            return result_lists[0]
+        return self.fuse(result_lists)
+
+    def fuse(self, result_lists):
+        functions = HelpFunctions()
+        scores = {}
+        merged = {}
+        for results in result_lists:
+            seen = set()
+            for rank, result in enumerate(results, start=1):
+                key = functions.canonical_url(result.get("url", ""))
+                if key in seen:
+                    continue
+                seen.add(key)
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.RRF_K + rank)
+                merged.setdefault(key, result)
+        return [merged[key] for key in sorted(merged, key=lambda k: -scores[k])]
+
+    def query_variants(self, query, templates):
+        keywords = " ".join(
+            word for word in query.split() if word.lower() not in STOP_WORDS
+        )
+        values = {"query": query, "keywords": keywords or query}
+        variants = [query]
+        for template in templates.split(";"):
+            template = template.strip()
+            if not template:
+                continue
+            # Only the two documented placeholders are filled; any other braces
+            # in an admin's template are kept as they are instead of failing.
+            variant = re.sub(
+                r"\{(query|keywords)\}", lambda m: values[m.group(1)], template
+            )
+            if variant not in variants:
+                variants.append(variant)
+        return variants
+
+
+class SearchResources:
+    """
+    Long-lived objects shared by every call on one Tools instance. They live here
+    rather than as Tools methods because OpenWebUI offers every public Tools method
+    to the model as a tool.
+    """
+
+    MAX_URL_POLICIES = 256
+
+    def __init__(self):
+        self.search_client = SearchClient()
+        self.hosts = HostTracker()
+        self._page_cache = None
+        self._page_cache_settings = None
+        self._url_policies = {}
+
+    def page_cache(self, valves):
+        if not valves.PAGE_CACHE_ENABLED:
+            return None
+        path = valves.PAGE_CACHE_PATH or os.path.join(
+            os.environ.get("DATA_DIR", tempfile.gettempdir()),
+            "web_search_pages.sqlite3",
+        )
+        settings = (
+            path,
+            valves.PAGE_CACHE_TTL,
+            valves.PAGE_CACHE_MAX_AGE,
+            valves.PAGE_CACHE_MAX_MB,
+        )
+        if self._page_cache is None or self._page_cache_settings != settings:
+            self._page_cache = PageCache(
+                path,
+                valves.PAGE_CACHE_TTL,
+                valves.PAGE_CACHE_MAX_AGE,
+                valves.PAGE_CACHE_MAX_MB * 1024 * 1024,
+            )
+            self._page_cache_settings = settings
+        return self._page_cache
+
+    def url_policy(self, valves, user_valves=None):
+        # Compiled per distinct ignore list, so users with their own lists each
+        # keep theirs; the oldest lists are dropped past MAX_URL_POLICIES.
+        user_ignored = getattr(user_valves, "IGNORED_WEBSITES", "")
+        source = ",".join(s for s in (valves.IGNORED_WEBSITES, user_ignored) if s)
+        policy = self._url_policies.pop(source, None) or UrlPolicy(source)
+        self._url_policies[source] = policy
+        while len(self._url_policies) > self.MAX_URL_POLICIES:
+            self._url_policies.pop(next(iter(self._url_policies)))
+        return policy
+
+
+class ToolMetrics:
+    """
+    Stage timings, request/byte counts and optional cProfile or tracemalloc capture
+    for one tool call, reported as a structured log record and optionally as a
+    final status event. Stages timed in worker threads add up, so they can exceed
+    the total. When disabled every hook is a no-op.
+    """
+
+    NO_STAGE = contextlib.nullcontext()
+    # tracemalloc and cProfile are process-wide: tracing runs while any call asks
+    # for it, and only one call at a time holds the profiler; others skip it.
+    capture_lock = threading.Lock()
+    tracing_calls = 0
+    owns_tracing = False
+    profiling = False
+
+    def __init__(self, method, enabled=False, profiler="", status_event=False):
+        self.method = method
+        self.enabled = enabled
+        self.status_event = enabled and status_event
+        if not enabled:
+            return
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.requests = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self.profiler = profiler.lower()
+        self.profile = None
+        self.tracing = False
+        self.finished = False
+        if self.profiler == "cprofile":
+            self.profile = self.start_profile()
+        elif self.profiler == "tracemalloc":
+            self.tracing = self.start_tracing()
+
+    @classmethod
+    def start_profile(cls):
+        # Profiles the event loop thread only; worker threads are not traced.
+        import cProfile
+
+        with cls.capture_lock:
+            if cls.profiling:
+                return None
+            cls.profiling = True
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (a debugger, say) is already active.
+            with cls.capture_lock:
+                cls.profiling = False
+            return None
+        return profile
+
+    @classmethod
+    def start_tracing(cls):
+        import tracemalloc
+
+        with cls.capture_lock:
+            if cls.tracing_calls == 0:
+                if tracemalloc.is_tracing():
+                    tracemalloc.reset_peak()
+                else:
+                    tracemalloc.start()
+                    cls.owns_tracing = True
+            cls.tracing_calls += 1
+        return True
+
+    @classmethod
+    def for_call(cls, method, valves):
+        return cls(
+            method,
+            valves.METRICS_ENABLED,
+            valves.METRICS_PROFILER,
+            valves.METRICS_STATUS_EVENT,
+        )
+
+    def stage(self, name):
+        if not self.enabled:
+            return self.NO_STAGE
+        return self.timed(name)
+
+    @contextlib.contextmanager
+    def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def count(self, requests=0, bytes=0):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.requests += requests
+            self.bytes += bytes
+
+    def finish(self):
+        # Metrics must never fail the tool call they measure. Tool methods also call
+        # this from `finally`, so cancelled calls release their capture too.
+        if not self.enabled or self.finished:
+            return None
+        self.finished = True
+        try:
+            return self.summarize()
+        except Exception as e:
+            logger.warning(f"{self.method} metrics failed: {e}")
+            return None
+        finally:
+            self.release()
+
+    def summarize(self):
+        summary = {
+            "tool": self.method,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "stages_ms": {k: round(v * 1000, 1) for k, v in self.stages.items()},
+            "requests": self.requests,
+            "bytes": self.bytes,
+        }
+        if self.profile is not None:
+            import io
+            import pstats
+
+            self.profile.disable()
+            output = io.StringIO()
+            pstats.Stats(self.profile, stream=output).sort_stats(
+                "cumulative"
+            ).print_stats(15)
+            summary["profile"] = output.getvalue()
+        elif self.tracing:
+            import tracemalloc
+
+            # Overlapping calls share one trace, so the peak covers them all.
+            with self.capture_lock:
+                summary["peak_kib"] = round(
+                    tracemalloc.get_traced_memory()[1] / 1024, 1
+                )
+                top = tracemalloc.take_snapshot().statistics("lineno")[:10]
+            summary["allocations"] = [str(stat) for stat in top]
+        logger.info(
+            "%s metrics: %s",
+            self.method,
+            json.dumps({k: v for k, v in summary.items() if k != "profile"}),
+            extra={"tool_metrics": summary},
+        )
+        if "profile" in summary:
+            logger.info("%s profile:\n%s", self.method, summary["profile"])
+        return summary
+
+    def release(self):
+        cls = type(self)
+        with cls.capture_lock:
+            if self.profile is not None:
+                self.profile.disable()
+                cls.profiling = False
+            if self.tracing:
+                cls.tracing_calls -= 1
+                if cls.tracing_calls == 0 and cls.owns_tracing:
+                    import tracemalloc
+
+                    tracemalloc.stop()
+                    cls.owns_tracing = False
+
+    def describe(self, summary):
+        stages = ", ".join(f"{k} {v:.0f} ms" for k, v in summary["stages_ms"].items())
+        return (
+            f"{self.method} took {summary['total_ms']:.0f} ms ({stages}), "
+            f"{summary['requests']} requests, {summary['bytes'] / 1024:.0f} KiB"
+        )
+
+    async def report(self, event_emitter=None):
+        summary = self.finish()
+        if summary and self.status_event and event_emitter:
+            await event_emitter(
+                {
+                    "type": "status",
+                    "data": {
+                        "status": "complete",
+                        "description": self.describe(summary),
+                        "done": True,
+                    },
+                }
+            )
+
+
+NO_METRICS = ToolMetrics("none")
+
+
 class EventEmitter:
     def __init__(self, event_emitter: Callable[[dict], Any] = None):
         self.event_emitter = event_emitter
@@ -136,21 +1377,118 @@ class Tools:
             default=5000,
             description="Limit words content for each page.",
         )
+        SEARCH_CONTEXT_WORDS_LIMIT: int = Field(
+            default=1500,
+            description="Words of page content returned across all pages, picking the passages most relevant to the query. 0 returns each page cut at PAGE_CONTENT_WORDS_LIMIT",
+        )
+        EXTRACTION_MODE: str = Field(
+            default="inline",
+            description="Where page HTML is parsed: inline (while downloading), thread (shared thread pool) or process (shared process pool, uses several cores; its workers start as fresh interpreters, never forked from OpenWebUI, and take a moment to start)",
+        )
+        EXTRACTION_WORKERS: int = Field(
+            default=0,
+            description="Workers in the thread or process extraction pool. 0 uses one less than the number of CPUs",
+        )
+        MAX_PAGE_BYTES: int = Field(
+            default=2000000,
+            description="Stop downloading a page after this many bytes. Search results declaring a larger size are skipped",
+        )
+        SEARCH_TIMEOUT: float = Field(
+            default=15.0,
+            description="Overall time budget in seconds for scraping result pages",
+        )
+        SCRAPE_HEDGE_DELAY: float = Field(
+            default=3.0,
+            gt=0,
+            description="Seconds without a finished page before an extra page is fetched",
+        )
+        NEAR_DUPLICATE_SIMILARITY: float = Field(
+            default=0.8,
+            description="Drop a page whose text overlaps this much (0-1) with a page already kept. 0 keeps near-duplicates",
+        )
+        MAX_REQUESTS_PER_HOST: int = Field(
+            default=2,
+            description="Maximum concurrent page downloads from one host",
+        )
+        HOST_MIN_INTERVAL: float = Field(
+            default=0.0,
+            description="Minimum seconds between starting two downloads from one host. The spacing is shared by every user's searches, so keep it small",
+        )
+        HOST_FAILURE_THRESHOLD: int = Field(
+            default=3,
+            description="Consecutive timeouts, connection errors or 429/503 answers from a host before it is skipped",
+        )
+        HOST_FAILURE_COOLDOWN: int = Field(
+            default=300,
+            description="Seconds to skip a host after HOST_FAILURE_THRESHOLD consecutive failures. 0 never skips",
+        )
+        PAGE_CACHE_ENABLED: bool = Field(
+            default=True,
+            description="Keep extracted page text on disk and revalidate it instead of re-downloading",
+        )
+        PAGE_CACHE_PATH: str = Field(
+            default="",
+            description="Path of the page cache database. Empty uses web_search_pages.sqlite3 in DATA_DIR or the temp directory",
+        )
+        PAGE_CACHE_TTL: int = Field(
+            default=3600,
+            description="Seconds a cached page is reused without asking the site",
+        )
+        PAGE_CACHE_MAX_AGE: int = Field(
+            default=604800,
+            description="Seconds a cached page is kept for revalidation before being dropped",
+        )
+        PAGE_CACHE_MAX_MB: int = Field(
+            default=100,
+            description="Size cap for cached page text in megabytes",
+        )
+        SEARCH_CACHE_TTL: int = Field(
+            default=300,
+            description="Seconds to reuse search engine results for the same query. 0 disables the cache",
+        )
+        SEARCH_FAN_OUT: bool = Field(
+            default=False,
+            description="Search several variants of the query at once and merge the results",
+        )
+        SEARCH_QUERY_VARIANTS: str = Field(
+            default='"{query}";{keywords}',
+            description="Semicolon-separated query templates for fan-out mode. {query} is the original query, {keywords} the query without common stop words",
+        )
+        METRICS_ENABLED: bool = Field(
+            default=False,
+            description="Record per-stage timings, request counts and bytes for each call and log them",
+        )
+        METRICS_PROFILER: str = Field(
+            default="",
+            description="Extra capture while metrics are enabled: cprofile, tracemalloc or empty for none",
+        )
+        METRICS_STATUS_EVENT: bool = Field(
+            default=False,
+            description="Also show the recorded timings as a final status message",
+        )
         CITATION_LINKS: bool = Field(
             default=False,
             description="If True, send custom citations with links",
         )
 
+    class UserValves(BaseModel):
+        IGNORED_WEBSITES: str = Field(
+            default="",
+            description="Comma-separated list of websites you want ignored, on top of the default list",
+        )
+
     def __init__(self):
         self.valves = self.Valves()
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
         }
+        self.resources = SearchResources()
 
     async def search_web(
         self,
         query: str,
         __event_emitter__: Callable[[dict], Any] = None,
+        __user__: dict = None,
     ) -> str:
         """
         Search the web and get the content of the relevant pages. Search for unknown knowledge, news, info, public contact info, weather, etc.
@@ -159,85 +1497,131 @@ class Tools:
         """
         functions = HelpFunctions()
         emitter = EventEmitter(__event_emitter__)
+        metrics = ToolMetrics.for_call("search_web", self.valves)
 
-        await emitter.emit(f"Initiating web search for: {query}")
-
-        search_engine_url = self.valves.SEARXNG_ENGINE_API_BASE_URL
+        try:
+            await emitter.emit(f"Initiating web search for: {query}")
 
-        # Ensure RETURNED_SCRAPPED_PAGES_NO does not exceed SCRAPPED_PAGES_NO
-        if self.valves.RETURNED_SCRAPPED_PAGES_NO > self.valves.SCRAPPED_PAGES_NO:
-            self.valves.RETURNED_SCRAPPED_PAGES_NO = self.valves.SCRAPPED_PAGES_NO
+            # Ensure RETURNED_SCRAPPED_PAGES_NO does not exceed SCRAPPED_PAGES_NO
+            if self.valves.RETURNED_SCRAPPED_PAGES_NO > self.valves.SCRAPPED_PAGES_NO:
+                self.valves.RETURNED_SCRAPPED_PAGES_NO = self.valves.SCRAPPED_PAGES_NO
 
-        params = {
-            "q": query,
-            "format": "json",
-            "number_of_results": self.valves.RETURNED_SCRAPPED_PAGES_NO,
-        }
+            params = {
+                "format": "json",
+                "number_of_results": self.valves.RETURNED_SCRAPPED_PAGES_NO,
+            }
+            queries = [query]
+            if self.valves.SEARCH_FAN_OUT:
+                queries = self.resources.search_client.query_variants(
+                    query, self.valves.SEARCH_QUERY_VARIANTS
+                )
 
-        try:
-            await emitter.emit("Sending request to search engine")
-            resp = requests.get(
-                search_engine_url, params=params, headers=self.headers, timeout=120
-            )
-            resp.raise_for_status()
-            data = resp.json()
+            try:
+                await emitter.emit("Sending request to search engine")
+                with metrics.stage("search"):
+                    results = await self.resources.search_client.fan_out(
+                        self.valves.SEARXNG_ENGINE_API_BASE_URL,
+                        queries,
+                        params,
+                        self.headers,
+                        self.valves.SEARCH_CACHE_TTL,
+                        metrics,
+                    )
+                self.resources.hosts.configure(
+                    self.valves.MAX_REQUESTS_PER_HOST,
+                    self.valves.HOST_MIN_INTERVAL,
+                    self.valves.HOST_FAILURE_COOLDOWN,
+                    self.valves.HOST_FAILURE_THRESHOLD,
+                )
+                limited_results = self.resources.url_policy(
+                    self.valves, (__user__ or {}).get("valves")
+                ).select(
+                    results,
+                    self.valves.SCRAPPED_PAGES_NO,
+                    self.resources.hosts.is_available,
+                )
+                await emitter.emit(f"Retrieved {len(limited_results)} search results")
 
-            results = data.get("results", [])
-            limited_results = results[: self.valves.SCRAPPED_PAGES_NO]
-            await emitter.emit(f"Retrieved {len(limited_results)} search results")
+            except requests.exceptions.RequestException as e:
+                await emitter.emit(
+                    status="error",
+                    description=f"Error during search: {str(e)}",
+                    done=True,
+                )
+                await metrics.report(__event_emitter__)
+                return json.dumps({"error": str(e)})
 
-        except requests.exceptions.RequestException as e:
-            await emitter.emit(
-                status="error",
-                description=f"Error during search: {str(e)}",
-                done=True,
-            )
-            return json.dumps({"error": str(e)})
+            results_json = []
+            if limited_results:
+                await emitter.emit(f"Processing search results")
 
-        results_json = []
-        if limited_results:
-            await emitter.emit(f"Processing search results")
+                page_cache = self.resources.page_cache(self.valves)
+                pool = ExtractionPools.get(
+                    self.valves.EXTRACTION_MODE, self.valves.EXTRACTION_WORKERS
+                )
 
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                futures = [
-                    executor.submit(
-                        functions.process_search_result, result, self.valves
+                def process(result, cancel_event):
+                    result_json = functions.process_search_result(
+                        result,
+                        self.valves,
+                        cancel_event,
+                        page_cache,
+                        self.resources.hosts,
+                        pool,
+                        metrics,
                     )
-                    for result in limited_results
-                ]
-                for future in concurrent.futures.as_completed(futures):
-                    result_json = future.result()
                     if result_json:
                         try:
                             json.dumps(result_json)
-                            results_json.append(result_json)
                         except (TypeError, ValueError):
-                            continue
-                    if len(results_json) >= self.valves.RETURNED_SCRAPPED_PAGES_NO:
-                        break
-
-            results_json = results_json[: self.valves.RETURNED_SCRAPPED_PAGES_NO]
+                            return None
+                    return result_json
 
-            if self.valves.CITATION_LINKS and __event_emitter__:
-                for result in results_json:
-                    await __event_emitter__(
-                        {
-                            "type": "citation",
-                            "data": {
-                                "document": [result["content"]],
-                                "metadata": [{"source": result["url"]}],
-                                "source": {"name": result["title"]},
-                            },
-                        }
+                scheduler = ScrapeScheduler(
+                    wanted=self.valves.RETURNED_SCRAPPED_PAGES_NO,
+                    time_budget=self.valves.SEARCH_TIMEOUT,
+                    hedge_delay=self.valves.SCRAPE_HEDGE_DELAY,
+                    max_in_flight=self.valves.SCRAPPED_PAGES_NO,
+                )
+                duplicates = NearDuplicateFilter(self.valves.NEAR_DUPLICATE_SIMILARITY)
+                with metrics.stage("scrape"):
+                    results_json = await scheduler.run(
+                        limited_results,
+                        process,
+                        accept=lambda result: duplicates.add(result["content"]),
                     )
 
-        await emitter.emit(
-            status="complete",
-            description=f"Web search completed. Retrieved content from {len(results_json)} pages",
-            done=True,
-        )
+                results_json = results_json[: self.valves.RETURNED_SCRAPPED_PAGES_NO]
 
-        return json.dumps(results_json, ensure_ascii=False)
+                if self.valves.SEARCH_CONTEXT_WORDS_LIMIT > 0:
+                    with metrics.stage("pack"):
+                        results_json = PassagePacker(
+                            query, self.valves.SEARCH_CONTEXT_WORDS_LIMIT
+                        ).pack(results_json)
+
+                if self.valves.CITATION_LINKS and __event_emitter__:
+                    for result in results_json:
+                        await __event_emitter__(
+                            {
+                                "type": "citation",
+                                "data": {
+                                    "document": [result["content"]],
+                                    "metadata": [{"source": result["url"]}],
+                                    "source": {"name": result["title"]},
+                                },
+                            }
+                        )
+
+            await emitter.emit(
+                status="complete",
+                description=f"Web search completed. Retrieved content from {len(results_json)} pages",
+                done=True,
+            )
+            await metrics.report(__event_emitter__)
+
+            return json.dumps(results_json, ensure_ascii=False)
+        finally:
+            metrics.finish()
 
     async def get_website(
         self, url: str, __event_emitter__: Callable[[dict], Any] = None
@@ -249,72 +1633,86 @@ class Tools:
         """
         functions = HelpFunctions()
         emitter = EventEmitter(__event_emitter__)
+        metrics = ToolMetrics.for_call("get_website", self.valves)
 
-        await emitter.emit(f"Fetching content from URL: {url}")
+        try:
+            await emitter.emit(f"Fetching content from URL: {url}")
 
-        results_json = []
+            results_json = []
 
-        try:
-            response_site = requests.get(url, headers=self.headers, timeout=120)
-            response_site.raise_for_status()
-            html_content = response_site.text
+            try:
+                page = await asyncio.get_running_loop().run_in_executor(
+                    None,
+                    lambda: functions.fetch_page(
+                        url,
+                        120,
+                        self.valves.MAX_PAGE_BYTES,
+                        self.valves.PAGE_CONTENT_WORDS_LIMIT,
+                        headers=self.headers,
+                        cache=self.resources.page_cache(self.valves),
+                        pool=ExtractionPools.get(
+                            self.valves.EXTRACTION_MODE, self.valves.EXTRACTION_WORKERS
+                        ),
+                        metrics=metrics,
+                    ),
+                )
 
-            await emitter.emit("Parsing website content")
+                await emitter.emit("Parsing website content")
 
-            soup = BeautifulSoup(html_content, "html.parser")
+                with metrics.stage("format"):
+                    page_title = page.title.strip() or "No title found"
+                    page_title = unicodedata.normalize("NFKC", page_title)
+                    page_title = functions.remove_emojis(page_title)
+                    title_site = page_title
+                    url_site = url
+                    content_site = functions.format_text(page.text)
 
-            page_title = soup.title.string if soup.title else "No title found"
-            page_title = unicodedata.normalize("NFKC", page_title.strip())
-            page_title = functions.remove_emojis(page_title)
-            title_site = page_title
-            url_site = url
-            content_site = functions.format_text(
-                soup.get_text(separator=" ", strip=True)
-            )
+                    truncated_content = functions.truncate_to_n_words(
+                        content_site, self.valves.PAGE_CONTENT_WORDS_LIMIT
+                    )
 
-            truncated_content = functions.truncate_to_n_words(
-                content_site, self.valves.PAGE_CONTENT_WORDS_LIMIT
-            )
+                    result_site = {
+                        "title": title_site,
+                        "url": url_site,
+                        "content": truncated_content,
+                        "excerpt": functions.generate_excerpt(content_site),
+                    }
 
-            result_site = {
-                "title": title_site,
-                "url": url_site,
-                "content": truncated_content,
-                "excerpt": functions.generate_excerpt(content_site),
-            }
+                results_json.append(result_site)
 
-            results_json.append(result_site)
+                if self.valves.CITATION_LINKS and __event_emitter__:
+                    await __event_emitter__(
+                        {
+                            "type": "citation",
+                            "data": {
+                                "document": [truncated_content],
+                                "metadata": [{"source": url_site}],
+                                "source": {"name": title_site},
+                            },
+                        }
+                    )
+
+                await emitter.emit(
+                    status="complete",
+                    description="Website content retrieved and processed successfully",
+                    done=True,
+                )
 
-            if self.valves.CITATION_LINKS and __event_emitter__:
-                await __event_emitter__(
+            except (requests.exceptions.RequestException, UnsupportedPage) as e:
+                results_json.append(
                     {
-                        "type": "citation",
-                        "data": {
-                            "document": [truncated_content],
-                            "metadata": [{"source": url_site}],
-                            "source": {"name": title_site},
-                        },
+                        "url": url,
+                        "content": f"Failed to retrieve the page. Error: {str(e)}",
                     }
                 )
 
-            await emitter.emit(
-                status="complete",
-                description="Website content retrieved and processed successfully",
-                done=True,
-            )
-
-        except requests.exceptions.RequestException as e:
-            results_json.append(
-                {
-                    "url": url,
-                    "content": f"Failed to retrieve the page. Error: {str(e)}",
-                }
-            )
-
-            await emitter.emit(
-                status="error",
-                description=f"Error fetching website content: {str(e)}",
-                done=True,
-            )
+                await emitter.emit(
+                    status="error",
+                    description=f"Error fetching website content: {str(e)}",
+                    done=True,
+                )
 
-        return json.dumps(results_json, ensure_ascii=False)
+            await metrics.report(__event_emitter__)
+            return json.dumps(results_json, ensure_ascii=False)
+        finally:
+            metrics.finish()
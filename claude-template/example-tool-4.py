@@ -0,0 +1,602 @@
+#    A template for tools that call an HTTP API, built to stay fast when many chats use it at once.
+#    It searches a simple JSON records API (GET api/search?q=..., GET api/records/<id>) - swap in your own service.
+#
+#    OpenWebUI keeps one Tools instance per tool and calls its methods from a single event loop, so
+#    anything kept on the instance is shared by every chat, and anything that blocks stalls all of them.
+#
+#    The reusable parts, copy them as they are:
+#
+#    - `SessionPool`: one aiohttp session per API server, kept between calls so connections stay open.
+#      Never use `requests` or another blocking client inside an async tool method.
+#    - `TTLCache`: bounded cache whose entries expire; the least recently used go first when it is full.
+#    - `SingleFlight`: concurrent calls that need the same response share one request.
+#    - `EventEmitter`: status updates for the user, with progress updates throttled to STATUS_INTERVAL.
+#    - `ToolMetrics`: per-stage timings and request counts, logged when METRICS_ENABLED is set.
+#    - `LazyImport`: heavy dependencies load on the first call, not when OpenWebUI loads the tool.
+#
+#    The tool specific part is `RecordsClient` and the two methods on `Tools`.
+#    Every public method on `Tools` is offered to the LLM, so helpers live on other classes.
+#    benchmarks/bench_template.py checks and measures this file against a local mock of the API.
+#    Everything must remain a single file.
+
+import asyncio
+import contextlib
+import importlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urljoin
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+
+class LazyImport:
+    """
+    Stands in for a module and imports it on first attribute access, so loading
+    the tool does not pay for dependencies until a call needs them.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+aiohttp = LazyImport("aiohttp")
+
+
+class SessionPool:
+    """
+    One aiohttp session per API server, reused across calls. Sessions belong to
+    the event loop that created them, so a call on another loop gets a new one;
+    a changed connection limit replaces the session too.
+    """
+
+    closing = set()
+
+    def __init__(self):
+        self.sessions = {}
+
+    def get(self, base_url: str, limit: int):
+        loop = asyncio.get_running_loop()
+        entry = self.sessions.get(base_url)
+        if entry is not None:
+            session, session_loop, session_limit = entry
+            if not session.closed and session_loop is loop and session_limit == limit:
+                return session
+            self.close_session(session, session_loop)
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=limit, ttl_dns_cache=300)
+        )
+        self.sessions[base_url] = (session, loop, limit)
+        return session
+
+    def close_session(self, session, loop):
+        if session.closed or loop.is_closed():
+            return None
+        task = loop.create_task(session.close())
+        self.closing.add(task)
+        task.add_done_callback(self.closing.discard)
+        return task
+
+    def close(self):
+        sessions, self.sessions = list(self.sessions.values()), {}
+        return [self.close_session(session, loop) for session, loop, _ in sessions]
+
+
+class TTLCache:
+    """
+    Bounded cache whose entries expire after ttl seconds. Reading an entry makes
+    it the most recently used; beyond max_entries the least recently used are
+    dropped. A ttl or max_entries of 0 disables caching.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, max_entries, ttl):
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl
+        self.trim()
+
+    def get(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None or entry[0] <= time.monotonic():
+            self.misses += 1
+            return None
+        self.entries[key] = entry
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value):
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return value
+        self.entries.pop(key, None)
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.trim()
+        return value
+
+    def trim(self):
+        while len(self.entries) > self.max_entries:
+            self.entries.pop(next(iter(self.entries)))
+
+
+class SingleFlight:
+    """
+    Runs at most one fetch per key at a time. Callers asking for a key that is
+    already being fetched wait for that fetch instead of starting another; a
+    caller that is cancelled does not cancel the fetch for the others.
+    """
+
+    def __init__(self):
+        self.flights = {}
+        self.shared = 0
+
+    async def run(self, key, fetch: Callable[[], Any]):
+        flight = self.flights.get(key)
+        if flight is None or flight.get_loop() is not asyncio.get_running_loop():
+            flight = asyncio.ensure_future(fetch())
+            self.flights[key] = flight
+            flight.add_done_callback(lambda done: self.landed(key, done))
+        else:
+            self.shared += 1
+        return await asyncio.shield(flight)
+
+    def landed(self, key, flight):
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+        if not flight.cancelled():
+            # Mark the error as retrieved even if every caller was cancelled.
+            flight.exception()
+
+
+class ToolMetrics:
+    """
+    Stage timings, request/byte counts and optional cProfile or tracemalloc capture
+    for one tool call, reported as a structured log record and optionally as a
+    final status event. When disabled every hook is a no-op.
+    """
+
+    NO_STAGE = contextlib.nullcontext()
+    # tracemalloc and cProfile are process-wide: tracing runs while any call asks
+    # for it, and only one call at a time holds the profiler; others skip it.
+    capture_lock = threading.Lock()
+    tracing_calls = 0
+    owns_tracing = False
+    profiling = False
+
+    def __init__(self, method, enabled=False, profiler="", status_event=False):
+        self.method = method
+        self.enabled = enabled
+        self.status_event = enabled and status_event
+        if not enabled:
+            return
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.requests = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self.profiler = profiler.lower()
+        self.profile = None
+        self.tracing = False
+        self.finished = False
+        if self.profiler == "cprofile":
+            self.profile = self.start_profile()
+        elif self.profiler == "tracemalloc":
+            self.tracing = self.start_tracing()
+
+    @classmethod
+    def start_profile(cls):
+        # Profiles the event loop thread only; worker threads are not traced.
+        import cProfile
+
+        with cls.capture_lock:
+            if cls.profiling:
+                return None
+            cls.profiling = True
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (a debugger, say) is already active.
+            with cls.capture_lock:
+                cls.profiling = False
+            return None
+        return profile
+
+    @classmethod
+    def start_tracing(cls):
+        import tracemalloc
+
+        with cls.capture_lock:
+            if cls.tracing_calls == 0:
+                if tracemalloc.is_tracing():
+                    tracemalloc.reset_peak()
+                else:
+                    tracemalloc.start()
+                    cls.owns_tracing = True
+            cls.tracing_calls += 1
+        return True
+
+    @classmethod
+    def for_call(cls, method, valves):
+        return cls(
+            method,
+            valves.METRICS_ENABLED,
+            valves.METRICS_PROFILER,
+            valves.METRICS_STATUS_EVENT,
+        )
+
+    def stage(self, name):
+        if not self.enabled:
+            return self.NO_STAGE
+        return self.timed(name)
+
+    @contextlib.contextmanager
+    def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def count(self, requests=0, bytes=0):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.requests += requests
+            self.bytes += bytes
+
+    def finish(self):
+        # Metrics must never fail the tool call they measure. Tool methods also call
+        # this from `finally`, so cancelled calls release their capture too.
+        if not self.enabled or self.finished:
+            return None
+        self.finished = True
+        try:
+            return self.summarize()
+        except Exception as e:
+            logger.warning(f"{self.method} metrics failed: {e}")
+            return None
+        finally:
+            self.release()
+
+    def summarize(self):
+        summary = {
+            "tool": self.method,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "stages_ms": {k: round(v * 1000, 1) for k, v in self.stages.items()},
+            "requests": self.requests,
+            "bytes": self.bytes,
+        }
+        if self.profile is not None:
+            import io
+            import pstats
+
+            self.profile.disable()
+            output = io.StringIO()
+            pstats.Stats(self.profile, stream=output).sort_stats(
+                "cumulative"
+            ).print_stats(15)
+            summary["profile"] = output.getvalue()
+        elif self.tracing:
+            import tracemalloc
+
+            # Overlapping calls share one trace, so the peak covers them all.
+            with self.capture_lock:
+                summary["peak_kib"] = round(
+                    tracemalloc.get_traced_memory()[1] / 1024, 1
+                )
+                top = tracemalloc.take_snapshot().statistics("lineno")[:10]
+            summary["allocations"] = [str(stat) for stat in top]
+        logger.info(
+            "%s metrics: %s",
+            self.method,
+            json.dumps({k: v for k, v in summary.items() if k != "profile"}),
+            extra={"tool_metrics": summary},
+        )
+        if "profile" in summary:
+            logger.info("%s profile:\n%s", self.method, summary["profile"])
+        return summary
+
+    def release(self):
+        cls = type(self)
+        with cls.capture_lock:
+            if self.profile is not None:
+                self.profile.disable()
+                cls.profiling = False
+            if self.tracing:
+                cls.tracing_calls -= 1
+                if cls.tracing_calls == 0 and cls.owns_tracing:
+                    import tracemalloc
+
+                    tracemalloc.stop()
+                    cls.owns_tracing = False
+
+    def describe(self, summary):
+        stages = ", ".join(f"{k} {v:.0f} ms" for k, v in summary["stages_ms"].items())
+        return (
+            f"{self.method} took {summary['total_ms']:.0f} ms ({stages}), "
+            f"{summary['requests']} requests, {summary['bytes'] / 1024:.0f} KiB"
+        )
+
+    async def report(self, event_emitter=None):
+        summary = self.finish()
+        if summary and self.status_event and event_emitter:
+            await event_emitter(
+                {
+                    "type": "status",
+                    "data": {
+                        "status": "complete",
+                        "description": self.describe(summary),
+                        "done": True,
+                    },
+                }
+            )
+
+
+NO_METRICS = ToolMetrics("none")
+
+
+class EventEmitter:
+    """
+    Status events for one call. In-progress updates less than min_interval
+    seconds after the last one sent are dropped; final (done) updates are
+    always sent.
+    """
+
+    def __init__(
+        self, event_emitter: Callable[[dict], Any] = None, min_interval: float = 0.0
+    ):
+        self.event_emitter = event_emitter
+        self.min_interval = min_interval
+        self.last_sent = None
+        self.sent = 0
+        self.dropped = 0
+
+    async def emit(self, description="Unknown State", status="in_progress", done=False):
+        if not self.event_emitter:
+            return
+        now = time.monotonic()
+        if (
+            not done
+            and self.last_sent is not None
+            and now - self.last_sent < self.min_interval
+        ):
+            self.dropped += 1
+            return
+        self.last_sent = now
+        self.sent += 1
+        await self.event_emitter(
+            {
+                "type": "status",
+                "data": {
+                    "status": status,
+                    "description": description,
+                    "done": done,
+                },
+            }
+        )
+
+
+class RecordsClient:
+    """
+    Reads the records API for one call. Responses are cached per server and
+    token, so users with different tokens never see each other's results.
+    """
+
+    def __init__(self, valves, sessions, cache, flights, metrics=None):
+        self.base_url = valves.API_URL
+        self.token = valves.API_TOKEN
+        self.valves = valves
+        self.sessions = sessions
+        self.cache = cache
+        self.flights = flights
+        self.metrics = metrics or NO_METRICS
+
+    @classmethod
+    def for_tools(cls, tools, metrics=None):
+        """A client using the state a Tools instance shares between calls."""
+        tools.cache.configure(tools.valves.CACHE_SIZE, tools.valves.CACHE_TTL)
+        return cls(tools.valves, tools.sessions, tools.cache, tools.flights, metrics)
+
+    async def get_json(self, path: str, params: Optional[dict] = None):
+        key = (self.base_url, self.token, path, tuple(sorted((params or {}).items())))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        return await self.flights.run(key, lambda: self.fetch(key, path, params))
+
+    async def fetch(self, key, path: str, params: Optional[dict]):
+        session = self.sessions.get(self.base_url, self.valves.MAX_CONCURRENT_REQUESTS)
+        headers = {"Authorization": f"Bearer {self.token}"}
+        timeout = aiohttp.ClientTimeout(total=self.valves.REQUEST_TIMEOUT)
+        try:
+            async with session.get(
+                urljoin(self.base_url, path),
+                headers=headers,
+                params=params,
+                timeout=timeout,
+            ) as response:
+                body = await response.read()
+                self.metrics.count(requests=1, bytes=len(body))
+                if response.status != 200:
+                    raise Exception(
+                        f"Error: {response.status} from {path}: {body[:200]!r}"
+                    )
+        except asyncio.TimeoutError:
+            raise Exception(f"Error: {path} did not answer in time")
+        except aiohttp.ClientError as e:
+            raise Exception(f"Error: {path} failed: {type(e).__name__} {e}")
+        return self.cache.set(key, json.loads(body))
+
+    async def search(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        data = await self.get_json("api/search", {"q": query, "limit": limit})
+        return data.get("results", [])[:limit]
+
+    async def record(self, record_id: int) -> Dict[str, Any]:
+        return await self.get_json(f"api/records/{record_id}")
+
+
+def format_record(record: Dict[str, Any], max_content_length: int) -> str:
+    return (
+        f"Record ID: {record.get('id')}\n"
+        f"Title: {record.get('title', 'Untitled')}\n"
+        f"Tags: {', '.join(record.get('tags') or []) or 'None'}\n"
+        f"Updated: {record.get('updated', 'Unknown')}\n"
+        f"Content: {(record.get('content') or '')[:max_content_length]}\n"
+        f"---\n"
+    )
+
+
+class Tools:
+    class Valves(BaseModel):
+        API_URL: str = Field(
+            default="https://records.yourdomain.com/",
+            description="Base URL of the records API",
+        )
+        API_TOKEN: str = Field(
+            default="",
+            description="Token sent as a Bearer token with every request",
+        )
+        MAX_RESULTS: int = Field(
+            default=5, description="Maximum number of records a search returns"
+        )
+        MAX_CONTENT_LENGTH: int = Field(
+            default=500, description="Maximum length of record content to return"
+        )
+        MAX_CONCURRENT_REQUESTS: int = Field(
+            default=8,
+            description="Open connections to the API server, shared by all calls",
+        )
+        REQUEST_TIMEOUT: float = Field(
+            default=10.0, description="Seconds to wait for a single API request"
+        )
+        CACHE_TTL: int = Field(
+            default=300,
+            description="Seconds to reuse an API response. 0 disables the cache",
+        )
+        CACHE_SIZE: int = Field(
+            default=1024,
+            description="API responses kept in the cache; the least recently used are dropped first",
+        )
+        STATUS_INTERVAL: float = Field(
+            default=0.25,
+            description="Minimum seconds between progress status updates",
+        )
+        METRICS_ENABLED: bool = Field(
+            default=False,
+            description="Record per-stage timings, request counts and bytes for each call and log them",
+        )
+        METRICS_PROFILER: str = Field(
+            default="",
+            description="Extra capture while metrics are enabled: cprofile, tracemalloc or empty for none",
+        )
+        METRICS_STATUS_EVENT: bool = Field(
+            default=False,
+            description="Also show the recorded timings as a final status message",
+        )
+
+    def __init__(self):
+        self.valves = self.Valves()
+        self.sessions = SessionPool()
+        self.cache = TTLCache()
+        self.flights = SingleFlight()
+
+    async def search_records(
+        self, query: str, __event_emitter__: Callable[[dict], Any] = None
+    ) -> str:
+        """
+        Search the records API and return the full text of the best matching records.
+
+        :param query: Words to search for in the records' titles and content.
+        :return: The matching records or an error message.
+        """
+        emitter = EventEmitter(__event_emitter__, self.valves.STATUS_INTERVAL)
+        metrics = ToolMetrics.for_call("search_records", self.valves)
+
+        try:
+            await emitter.emit(f"Searching records for: {query}")
+            client = RecordsClient.for_tools(self, metrics)
+
+            with metrics.stage("search"):
+                hits = await client.search(query, self.valves.MAX_RESULTS)
+            if not hits:
+                message = f"No records found for: {query}"
+                await emitter.emit(message, "success", True)
+                await metrics.report(__event_emitter__)
+                return message
+
+            loaded = 0
+
+            async def load(hit):
+                nonlocal loaded
+                record = await client.record(hit["id"])
+                loaded += 1
+                await emitter.emit(f"Loaded {loaded} of {len(hits)} records")
+                return record
+
+            with metrics.stage("fetch"):
+                records = await asyncio.gather(*map(load, hits))
+
+            with metrics.stage("format"):
+                result = f"Found {len(records)} records for: {query}\n\n" + "\n".join(
+                    format_record(record, self.valves.MAX_CONTENT_LENGTH)
+                    for record in records
+                )
+
+            await emitter.emit(
+                f"Retrieved {len(records)} records for: {query}", "success", True
+            )
+            await metrics.report(__event_emitter__)
+            return result
+        except Exception as e:
+            error_message = str(e) if str(e).startswith("Error") else f"Error: {e}"
+            await emitter.emit(error_message, "error", True)
+            await metrics.report(__event_emitter__)
+            return error_message
+        finally:
+            metrics.finish()
+
+    async def get_record(
+        self, record_id: int, __event_emitter__: Callable[[dict], Any] = None
+    ) -> str:
+        """
+        Get one record by its ID, e.g. an ID from an earlier search.
+
+        :param record_id: The ID of the record.
+        :return: The record or an error message.
+        """
+        emitter = EventEmitter(__event_emitter__, self.valves.STATUS_INTERVAL)
+        metrics = ToolMetrics.for_call("get_record", self.valves)
+
+        try:
+            await emitter.emit(f"Loading record {record_id}")
+            with metrics.stage("fetch"):
+                record = await RecordsClient.for_tools(self, metrics).record(record_id)
+            with metrics.stage("format"):
+                result = format_record(record, self.valves.MAX_CONTENT_LENGTH)
+            await emitter.emit(f"Loaded record {record_id}", "success", True)
+            await metrics.report(__event_emitter__)
+            return result
+        except Exception as e:
+            error_message = str(e) if str(e).startswith("Error") else f"Error: {e}"
+            await emitter.emit(error_message, "error", True)
+            await metrics.report(__event_emitter__)
+            return error_message
+        finally:
+            metrics.finish()
@@ -8,40 +8,120 @@
 
 
 
-import requests
+import asyncio
 import logging
-from datetime import datetime
-import pytz
+import contextlib
+import importlib
+import json
+import math
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
 from typing import Callable, Any, Dict, List
 from pydantic import BaseModel, Field
 from urllib.parse import urljoin
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
+class LazyImport:
+    """
+    Stands in for a module and imports it on first attribute access, so loading
+    the tool does not pay for dependencies until a call needs them.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+requests = LazyImport("requests")
+
+
 class HelpFunctions:
     def __init__(self):
-        self.berlin_tz = pytz.timezone("Europe/Berlin")
+        self.berlin_tz = ZoneInfo("Europe/Berlin")
 
     def get_api_url(self, base_url: str, endpoint: str) -> str:
         base_url = base_url.rstrip("/")
         api_path = f"/api/v1/{endpoint.lstrip('/')}"
         return urljoin(base_url, api_path)
 
-    def query_projects(self, base_url: str, api_token: str) -> Dict[int, str]:
+    def user_credentials(self, valves, user: dict = None):
+        user = user or {}
+        user_valves = user.get("valves")
+        api_token = getattr(user_valves, "VIKUNJA_API_TOKEN", "")
+        if api_token:
+            base_url = (
+                getattr(user_valves, "VIKUNJA_BASE_URL", "") or valves.VIKUNJA_BASE_URL
+            )
+        else:
+            # The shared token is only ever sent to the admin-configured instance.
+            if user.get("id") and not valves.ALLOW_SHARED_TOKEN:
+                raise ValueError("Set your Vikunja API token in the tool's user valves")
+            base_url = valves.VIKUNJA_BASE_URL
+            api_token = valves.VIKUNJA_API_TOKEN
+        return base_url, api_token, (user.get("id", ""), base_url, api_token)
+
+    def query_projects(
+        self,
+        base_url: str,
+        api_token: str,
+        metrics=None,
+        session=None,
+        timeout: float = 10.0,
+    ) -> Dict[int, str]:
         projects_url = self.get_api_url(base_url, "projects")
         headers = {"Authorization": f"Bearer {api_token}"}
         try:
-            response = requests.get(projects_url, headers=headers)
+            response = (session or requests).get(
+                projects_url, headers=headers, timeout=timeout
+            )
+            (metrics or NO_METRICS).count(requests=1, bytes=len(response.content))
             response.raise_for_status()
             return {project["id"]: project["title"] for project in response.json()}
         except Exception as e:
             logger.error(f"Error querying projects: {e}")
             return {}
 
+    def get_project_map(
+        self,
+        user,
+        base_url: str,
+        api_token: str,
+        ttl: int,
+        metrics=None,
+        timeout: float = 10.0,
+    ) -> Dict[int, str]:
+        now = time.monotonic()
+        if user.projects is not None and user.projects_expire > now:
+            return user.projects
+        project_map = self.query_projects(
+            base_url, api_token, metrics, user.session, timeout
+        )
+        if project_map and ttl > 0:
+            user.projects = project_map
+            user.projects_expire = now + ttl
+        return project_map
+
     def fetch_tasks(
-        self, base_url: str, api_token: str, max_todos: int
+        self,
+        base_url: str,
+        api_token: str,
+        max_todos: int,
+        metrics=None,
+        session=None,
+        params: Dict[str, Any] = None,
+        stop: Callable[[Dict[str, Any]], bool] = None,
+        raise_errors: bool = False,
+        timeout: float = 10.0,
     ) -> List[Dict[str, Any]]:
         tasks_url = self.get_api_url(base_url, "tasks/all")
         headers = {"Authorization": f"Bearer {api_token}"}
@@ -49,20 +129,53 @@ class HelpFunctions:
         page = 1
         while True:
             try:
-                response = requests.get(
-                    f"{tasks_url}?page={page}&per_page={max_todos}", headers=headers
+                response = (session or requests).get(
+                    tasks_url,
+                    params={"page": page, "per_page": max_todos, **(params or {})},
+                    headers=headers,
+                    timeout=timeout,
                 )
+                (metrics or NO_METRICS).count(requests=1, bytes=len(response.content))
                 response.raise_for_status()
                 page_tasks = response.json()
                 tasks.extend(page_tasks)
                 if len(page_tasks) < max_todos:
                     break
+                if stop is not None and any(stop(task) for task in page_tasks):
+                    break
                 page += 1
             except Exception as e:
+                if raise_errors:
+                    raise
                 logger.error(f"Error fetching tasks: {e}")
                 break
         return tasks
 
+    def format_search_results(
+        self,
+        tasks: List[Dict[str, Any]],
+        project_map: Dict[int, str],
+        max_content_length: int,
+    ) -> str:
+        lines = []
+        for rank, task in enumerate(tasks, 1):
+            details = [
+                f"Project: {project_map.get(task.get('project_id'), 'No project')}",
+                f"Due: {self.format_date(task.get('due_date'))}",
+            ]
+            labels = [label.get("title", "") for label in task.get("labels") or []]
+            if labels:
+                details.append(f"Labels: {', '.join(labels)}")
+            if task.get("done"):
+                details.append("Done")
+            lines.append(
+                f"{rank}. {task['title'][:max_content_length]} ({', '.join(details)})"
+            )
+            description = TaskIndex.plain_text(task.get("description"))
+            if description:
+                lines.append(f"   {description[:max_content_length]}")
+        return "\n".join(lines)
+
     def format_date(self, date_str: str) -> str:
         if not date_str or date_str == "0001-01-01T00:00:00Z":
             return "No due date"
@@ -114,6 +227,446 @@ class HelpFunctions:
         return "\n".join(formatted_tasks) if formatted_tasks else "No open todos found."
 
 
+class ToolMetrics:
+    """
+    Stage timings, request/byte counts and optional cProfile or tracemalloc capture
+    for one tool call, reported as a structured log record and optionally as a
+    final status event. When disabled every hook is a no-op.
+    """
+
+    NO_STAGE = contextlib.nullcontext()
+    # tracemalloc and cProfile are process-wide: tracing runs while any call asks
+    # for it, and only one call at a time holds the profiler; others skip it.
+    capture_lock = threading.Lock()
+    tracing_calls = 0
+    owns_tracing = False
+    profiling = False
+
+    def __init__(self, method, enabled=False, profiler="", status_event=False):
+        self.method = method
+        self.enabled = enabled
+        self.status_event = enabled and status_event
+        if not enabled:
+            return
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.requests = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self.profiler = profiler.lower()
+        self.profile = None
+        self.tracing = False
+        self.finished = False
+        if self.profiler == "cprofile":
+            self.profile = self.start_profile()
+        elif self.profiler == "tracemalloc":
+            self.tracing = self.start_tracing()
+
+    @classmethod
+    def start_profile(cls):
+        # Profiles the event loop thread only; worker threads are not traced.
+        import cProfile
+
+        with cls.capture_lock:
+            if cls.profiling:
+                return None
+            cls.profiling = True
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (a debugger, say) is already active.
+            with cls.capture_lock:
+                cls.profiling = False
+            return None
+        return profile
+
+    @classmethod
+    def start_tracing(cls):
+        import tracemalloc
+
+        with cls.capture_lock:
+            if cls.tracing_calls == 0:
+                if tracemalloc.is_tracing():
+                    tracemalloc.reset_peak()
+                else:
+                    tracemalloc.start()
+                    cls.owns_tracing = True
+            cls.tracing_calls += 1
+        return True
+
+    @classmethod
+    def for_call(cls, method, valves):
+        return cls(
+            method,
+            valves.METRICS_ENABLED,
+            valves.METRICS_PROFILER,
+            valves.METRICS_STATUS_EVENT,
+        )
+
+    def stage(self, name):
+        if not self.enabled:
+            return self.NO_STAGE
+        return self.timed(name)
+
+    @contextlib.contextmanager
+    def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def count(self, requests=0, bytes=0):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.requests += requests
+            self.bytes += bytes
+
+    def finish(self):
+        # Metrics must never fail the tool call they measure. Tool methods also call
+        # this from `finally`, so cancelled calls release their capture too.
+        if not self.enabled or self.finished:
+            return None
+        self.finished = True
+        try:
+            return self.summarize()
+        except Exception as e:
+            logger.warning(f"{self.method} metrics failed: {e}")
+            return None
+        finally:
+            self.release()
+
+    def summarize(self):
+        summary = {
+            "tool": self.method,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "stages_ms": {k: round(v * 1000, 1) for k, v in self.stages.items()},
+            "requests": self.requests,
+            "bytes": self.bytes,
+        }
+        if self.profile is not None:
+            import io
+            import pstats
+
+            self.profile.disable()
+            output = io.StringIO()
+            pstats.Stats(self.profile, stream=output).sort_stats(
+                "cumulative"
+            ).print_stats(15)
+            summary["profile"] = output.getvalue()
+        elif self.tracing:
+            import tracemalloc
+
+            # Overlapping calls share one trace, so the peak covers them all.
+            with self.capture_lock:
+                summary["peak_kib"] = round(
+                    tracemalloc.get_traced_memory()[1] / 1024, 1
+                )
+                top = tracemalloc.take_snapshot().statistics("lineno")[:10]
+            summary["allocations"] = [str(stat) for stat in top]
+        logger.info(
+            "%s metrics: %s",
+            self.method,
+            json.dumps({k: v for k, v in summary.items() if k != "profile"}),
+            extra={"tool_metrics": summary},
+        )
+        if "profile" in summary:
+            logger.info("%s profile:\n%s", self.method, summary["profile"])
+        return summary
+
+    def release(self):
+        cls = type(self)
+        with cls.capture_lock:
+            if self.profile is not None:
+                self.profile.disable()
+                cls.profiling = False
+            if self.tracing:
+                cls.tracing_calls -= 1
+                if cls.tracing_calls == 0 and cls.owns_tracing:
+                    import tracemalloc
+
+                    tracemalloc.stop()
+                    cls.owns_tracing = False
+
+    def describe(self, summary):
+        stages = ", ".join(f"{k} {v:.0f} ms" for k, v in summary["stages_ms"].items())
+        return (
+            f"{self.method} took {summary['total_ms']:.0f} ms ({stages}), "
+            f"{summary['requests']} requests, {summary['bytes'] / 1024:.0f} KiB"
+        )
+
+    async def report(self, event_emitter=None):
+        summary = self.finish()
+        if summary and self.status_event and event_emitter:
+            await event_emitter(
+                {
+                    "type": "status",
+                    "data": {
+                        "status": "complete",
+                        "description": self.describe(summary),
+                        "done": True,
+                    },
+                }
+            )
+
+
+NO_METRICS = ToolMetrics("none")
+
+
+class TaskIndex:
+    """
+    Inverted index over one user's tasks (title, labels, description), ranked with
+    BM25. refresh() fetches tasks most recently updated first and stops at the
+    first page older than the last sync, re-indexing only tasks that changed; a
+    full sync every full_sync_interval seconds also drops deleted tasks.
+    Calls run in worker threads, so refresh() and search() hold a lock; callers
+    arriving during a refresh wait for it and then find the index fresh.
+    """
+
+    FIELD_WEIGHTS = {"title": 3.0, "labels": 2.0, "description": 1.0}
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self.tasks = {}
+        self.terms = {}
+        self.lengths = {}
+        self.postings = {}
+        self.total_length = 0.0
+        self.watermark = None
+        self.checked_at = None
+        self.lock = threading.Lock()
+        self.full_sync_at = None
+
+    @staticmethod
+    def plain_text(text: str) -> str:
+        return " ".join(re.sub(r"<[^>]+>", " ", text or "").split())
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        return re.findall(r"\w+", TaskIndex.plain_text(text).lower())
+
+    @staticmethod
+    def updated(task: Dict[str, Any]) -> datetime:
+        try:
+            return datetime.fromisoformat(task["updated"].replace("Z", "+00:00"))
+        except (KeyError, TypeError, ValueError):
+            return datetime.min.replace(tzinfo=timezone.utc)
+
+    def add(self, task: Dict[str, Any]):
+        task_id = task["id"]
+        current = self.tasks.get(task_id)
+        if current is not None and current.get("updated") == task.get("updated"):
+            self.tasks[task_id] = task
+            return
+        self.remove(task_id)
+        weights = {}
+        fields = {
+            "title": task.get("title", ""),
+            "labels": " ".join(
+                label.get("title", "") for label in task.get("labels") or []
+            ),
+            "description": task.get("description", ""),
+        }
+        for field, text in fields.items():
+            for term in self.tokenize(text):
+                weights[term] = weights.get(term, 0.0) + self.FIELD_WEIGHTS[field]
+        for term, weight in weights.items():
+            self.postings.setdefault(term, {})[task_id] = weight
+        self.tasks[task_id] = task
+        self.terms[task_id] = weights
+        self.lengths[task_id] = sum(weights.values())
+        self.total_length += self.lengths[task_id]
+
+    def remove(self, task_id: int):
+        self.tasks.pop(task_id, None)
+        weights = self.terms.pop(task_id, {})
+        for term in weights:
+            posting = self.postings.get(term, {})
+            posting.pop(task_id, None)
+            if not posting:
+                self.postings.pop(term, None)
+        self.total_length -= self.lengths.pop(task_id, 0.0)
+
+    def refresh(
+        self,
+        helper,
+        base_url: str,
+        api_token: str,
+        session,
+        per_page: int,
+        refresh_interval: float,
+        full_sync_interval: float,
+        metrics=None,
+        timeout: float = 10.0,
+    ):
+        with self.lock:
+            self.sync(
+                helper,
+                base_url,
+                api_token,
+                session,
+                per_page,
+                refresh_interval,
+                full_sync_interval,
+                metrics,
+                timeout,
+            )
+
+    def sync(
+        self,
+        helper,
+        base_url: str,
+        api_token: str,
+        session,
+        per_page: int,
+        refresh_interval: float,
+        full_sync_interval: float,
+        metrics=None,
+        timeout: float = 10.0,
+    ):
+        now = time.monotonic()
+        if self.checked_at is not None and now - self.checked_at < refresh_interval:
+            return
+        full = (
+            self.full_sync_at is None or now - self.full_sync_at >= full_sync_interval
+        )
+        params = {} if full else {"sort_by": "updated", "order_by": "desc"}
+        watermark = None if full else self.watermark
+        try:
+            tasks = helper.fetch_tasks(
+                base_url,
+                api_token,
+                per_page,
+                metrics,
+                session,
+                params=params,
+                stop=lambda task: watermark and self.updated(task) < watermark,
+                raise_errors=True,
+                timeout=timeout,
+            )
+        except Exception as e:
+            # Searching a slightly stale index beats failing the search.
+            logger.error(f"Error refreshing task index: {e}")
+            return
+        if full:
+            for task_id in set(self.tasks) - {task["id"] for task in tasks}:
+                self.remove(task_id)
+            self.full_sync_at = now
+        for task in tasks:
+            self.add(task)
+        if self.tasks:
+            self.watermark = max(self.updated(task) for task in self.tasks.values())
+        self.checked_at = now
+
+    def search(
+        self, query: str, limit: int, include_done: bool = False
+    ) -> List[Dict[str, Any]]:
+        with self.lock:
+            return self.rank(query, limit, include_done)
+
+    def rank(
+        self, query: str, limit: int, include_done: bool = False
+    ) -> List[Dict[str, Any]]:
+        scores = {}
+        average_length = self.total_length / max(1, len(self.tasks))
+        for query_term in set(self.tokenize(query)):
+            terms = [query_term] if query_term in self.postings else []
+            if not terms and len(query_term) >= 3:
+                # Unknown words still find tasks through words they start.
+                terms = [t for t in self.postings if t.startswith(query_term)]
+            for term in terms:
+                posting = self.postings[term]
+                idf = math.log(
+                    1 + (len(self.tasks) - len(posting) + 0.5) / (len(posting) + 0.5)
+                )
+                for task_id, weight in posting.items():
+                    length = self.lengths[task_id]
+                    norm = self.K1 * (1 - self.B + self.B * length / average_length)
+                    scores[task_id] = scores.get(task_id, 0.0) + idf * weight * (
+                        self.K1 + 1
+                    ) / (weight + norm)
+        ranked = sorted(scores, key=lambda task_id: (-scores[task_id], task_id))
+        matches = [
+            self.tasks[task_id]
+            for task_id in ranked
+            if include_done or not self.tasks[task_id].get("done")
+        ]
+        return matches[:limit]
+
+
+class VikunjaUser:
+    """HTTP session, cached project names and task index for one user's account."""
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.projects = None
+        self.projects_expire = 0.0
+        self.index = TaskIndex()
+        self.active = 0
+        self.last_used = time.monotonic()
+
+    def close(self):
+        self.session.close()
+
+
+class UserRegistry:
+    """
+    Per-user state keyed by user id and credentials, so users never share a
+    session or cache. Users idle for longer than idle_timeout are dropped, as are
+    the least recently used ones beyond max_users; state a running call holds is
+    never dropped.
+    """
+
+    def __init__(self, factory, idle_timeout=900, max_users=200):
+        self.factory = factory
+        self.idle_timeout = idle_timeout
+        self.max_users = max_users
+        self.lock = threading.Lock()
+        self.states = {}
+
+    def configure(self, idle_timeout, max_users):
+        self.idle_timeout = idle_timeout
+        self.max_users = max(1, max_users)
+
+    @contextlib.contextmanager
+    def use(self, key):
+        with self.lock:
+            state = self.states.pop(key, None)
+            if state is None:
+                state = self.factory()
+            state.active += 1
+            self.states[key] = state
+            evicted = self.evict(time.monotonic())
+        for old in evicted:
+            old.close()
+        try:
+            yield state
+        finally:
+            with self.lock:
+                state.active -= 1
+                state.last_used = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            states, self.states = list(self.states.values()), {}
+        return [state.close() for state in states]
+
+    def evict(self, now):
+        evicted = []
+        for key, state in list(self.states.items()):
+            if state.active:
+                continue
+            idle = now - state.last_used > self.idle_timeout
+            if idle or len(self.states) > self.max_users:
+                evicted.append(self.states.pop(key))
+        return evicted
+
+
 class Tools:
     class Valves(BaseModel):
         VIKUNJA_BASE_URL: str = Field(
@@ -130,13 +683,69 @@ class Tools:
         MAX_CONTENT_LENGTH: int = Field(
             default=500, description="Maximum length of todo content to return"
         )
+        REQUEST_TIMEOUT: float = Field(
+            default=10.0, description="Seconds to wait for a single Vikunja request"
+        )
+        PROJECT_CACHE_TTL: int = Field(
+            default=60,
+            description="Seconds to reuse a user's project names between calls. 0 fetches them every call",
+        )
+        SEARCH_RESULTS_LIMIT: int = Field(
+            default=10, description="Maximum number of tasks search_tasks returns"
+        )
+        TASK_INDEX_REFRESH: int = Field(
+            default=30,
+            description="Seconds a user's task search index is used before checking Vikunja for updated tasks",
+        )
+        TASK_INDEX_FULL_SYNC: int = Field(
+            default=900,
+            description="Seconds between full re-syncs of the task search index, which also drop deleted tasks",
+        )
+        ALLOW_SHARED_TOKEN: bool = Field(
+            default=True,
+            description="Use VIKUNJA_API_TOKEN for users who have not set their own token",
+        )
+        USER_IDLE_TIMEOUT: int = Field(
+            default=900,
+            description="Seconds after which an inactive user's session and cache are dropped",
+        )
+        MAX_ACTIVE_USERS: int = Field(
+            default=200,
+            description="Users whose session and cache are kept at once; the least recently active are dropped first",
+        )
+        METRICS_ENABLED: bool = Field(
+            default=False,
+            description="Record per-stage timings, request counts and bytes for each call and log them",
+        )
+        METRICS_PROFILER: str = Field(
+            default="",
+            description="Extra capture while metrics are enabled: cprofile, tracemalloc or empty for none",
+        )
+        METRICS_STATUS_EVENT: bool = Field(
+            default=False,
+            description="Also show the recorded timings as a final status message",
+        )
+
+    class UserValves(BaseModel):
+        VIKUNJA_BASE_URL: str = Field(
+            default="",
+            description="Your Vikunja instance, if it differs from the default one. Used together with your own token",
+        )
+        VIKUNJA_API_TOKEN: str = Field(
+            default="",
+            description="Your personal Vikunja API token",
+        )
 
     def __init__(self):
         self.valves = self.Valves()
         self.helper = HelpFunctions()
+        self.users = UserRegistry(VikunjaUser)
 
     async def get_todos(
-        self, query: str, __event_emitter__: Callable[[dict], Any] = None
+        self,
+        query: str,
+        __event_emitter__: Callable[[dict], Any] = None,
+        __user__: dict = None,
     ) -> str:
         """
         Retrieve todos from Vikunja, optionally filtered by project.
@@ -159,22 +768,44 @@ class Tools:
                 }
             )
 
+        metrics = ToolMetrics.for_call("get_todos", self.valves)
         try:
             specific_project = None
             if "for project" in query.lower():
                 specific_project = query.lower().split("for project")[-1].strip()
 
-            project_map = self.helper.query_projects(
-                self.valves.VIKUNJA_BASE_URL, self.valves.VIKUNJA_API_TOKEN
-            )
-            tasks = self.helper.fetch_tasks(
-                self.valves.VIKUNJA_BASE_URL,
-                self.valves.VIKUNJA_API_TOKEN,
-                self.valves.MAX_TODOS,
+            base_url, api_token, user_key = self.helper.user_credentials(
+                self.valves, __user__
             )
-            result = self.helper.format_tasks(
-                tasks, project_map, self.valves.MAX_CONTENT_LENGTH, specific_project
+            self.users.configure(
+                self.valves.USER_IDLE_TIMEOUT, self.valves.MAX_ACTIVE_USERS
             )
+            with self.users.use(user_key) as user, metrics.stage("fetch"):
+                # requests blocks, so the calls run in threads, off the event loop.
+                project_map, tasks = await asyncio.gather(
+                    asyncio.to_thread(
+                        self.helper.get_project_map,
+                        user,
+                        base_url,
+                        api_token,
+                        self.valves.PROJECT_CACHE_TTL,
+                        metrics,
+                        self.valves.REQUEST_TIMEOUT,
+                    ),
+                    asyncio.to_thread(
+                        self.helper.fetch_tasks,
+                        base_url,
+                        api_token,
+                        self.valves.MAX_TODOS,
+                        metrics,
+                        user.session,
+                        timeout=self.valves.REQUEST_TIMEOUT,
+                    ),
+                )
+            with metrics.stage("format"):
+                result = self.helper.format_tasks(
+                    tasks, project_map, self.valves.MAX_CONTENT_LENGTH, specific_project
+                )
 
             if __event_emitter__:
                 await __event_emitter__(
@@ -189,6 +820,7 @@ class Tools:
                 )
 
             logger.debug("Todos retrieved and formatted successfully")
+            await metrics.report(__event_emitter__)
             return result
 
         except Exception as e:
@@ -205,10 +837,130 @@ class Tools:
                         },
                     }
                 )
+            await metrics.report(__event_emitter__)
             return error_message
+        finally:
+            metrics.finish()
+
+    async def search_tasks(
+        self,
+        query: str,
+        include_done: bool = False,
+        __event_emitter__: Callable[[dict], Any] = None,
+        __user__: dict = None,
+    ) -> str:
+        """
+        Search Vikunja tasks by words in their title, description or labels and return the best matches.
+        Prefer this over get_todos when the user asks about specific tasks.
+        :param query: Words describing the tasks to find, e.g. "dentist appointment" or "invoice ACME".
+        :param include_done: Also return tasks that are already done.
+        :param __event_emitter__: Optional event emitter to send status updates to Open Web UI.
+        :return: The matching tasks, best match first.
+        """
+        logger.debug(f"Searching tasks for: {query}")
+
+        if __event_emitter__:
+            await __event_emitter__(
+                {
+                    "type": "status",
+                    "data": {
+                        "status": "in_progress",
+                        "description": f"Searching tasks for: {query}",
+                        "done": False,
+                    },
+                }
+            )
+
+        metrics = ToolMetrics.for_call("search_tasks", self.valves)
+        try:
+            base_url, api_token, user_key = self.helper.user_credentials(
+                self.valves, __user__
+            )
+            self.users.configure(
+                self.valves.USER_IDLE_TIMEOUT, self.valves.MAX_ACTIVE_USERS
+            )
+            with self.users.use(user_key) as user:
+                # requests blocks, so the calls run in threads, off the event loop.
+                with metrics.stage("fetch"):
+                    await asyncio.to_thread(
+                        user.index.refresh,
+                        self.helper,
+                        base_url,
+                        api_token,
+                        user.session,
+                        self.valves.MAX_TODOS,
+                        self.valves.TASK_INDEX_REFRESH,
+                        self.valves.TASK_INDEX_FULL_SYNC,
+                        metrics,
+                        self.valves.REQUEST_TIMEOUT,
+                    )
+                with metrics.stage("search"):
+                    matches = await asyncio.to_thread(
+                        user.index.search,
+                        query,
+                        self.valves.SEARCH_RESULTS_LIMIT,
+                        include_done,
+                    )
+                if matches:
+                    with metrics.stage("fetch"):
+                        project_map = await asyncio.to_thread(
+                            self.helper.get_project_map,
+                            user,
+                            base_url,
+                            api_token,
+                            self.valves.PROJECT_CACHE_TTL,
+                            metrics,
+                            self.valves.REQUEST_TIMEOUT,
+                        )
+
+            if matches:
+                with metrics.stage("format"):
+                    result = f"Tasks matching '{query}':\n" + (
+                        self.helper.format_search_results(
+                            matches, project_map, self.valves.MAX_CONTENT_LENGTH
+                        )
+                    )
+            else:
+                result = f"No tasks found matching '{query}'."
+
+            if __event_emitter__:
+                await __event_emitter__(
+                    {
+                        "type": "status",
+                        "data": {
+                            "status": "success",
+                            "description": f"Found {len(matches)} matching tasks.",
+                            "done": True,
+                        },
+                    }
+                )
+
+            await metrics.report(__event_emitter__)
+            return result
+
+        except Exception as e:
+            error_message = f"Error searching tasks: {str(e)}"
+            logger.error(error_message)
+            if __event_emitter__:
+                await __event_emitter__(
+                    {
+                        "type": "status",
+                        "data": {
+                            "status": "error",
+                            "description": error_message,
+                            "done": True,
+                        },
+                    }
+                )
+            await metrics.report(__event_emitter__)
+            return error_message
+        finally:
+            metrics.finish()
 
     async def get_projects(
-        self, __event_emitter__: Callable[[dict], Any] = None
+        self,
+        __event_emitter__: Callable[[dict], Any] = None,
+        __user__: dict = None,
     ) -> str:
         """
         Retrieve all project names from Vikunja.
@@ -229,20 +981,36 @@ class Tools:
                 }
             )
 
+        metrics = ToolMetrics.for_call("get_projects", self.valves)
         try:
-            project_map = self.helper.query_projects(
-                self.valves.VIKUNJA_BASE_URL, self.valves.VIKUNJA_API_TOKEN
+            base_url, api_token, user_key = self.helper.user_credentials(
+                self.valves, __user__
             )
+            self.users.configure(
+                self.valves.USER_IDLE_TIMEOUT, self.valves.MAX_ACTIVE_USERS
+            )
+            with self.users.use(user_key) as user, metrics.stage("fetch"):
+                project_map = await asyncio.to_thread(
+                    self.helper.get_project_map,
+                    user,
+                    base_url,
+                    api_token,
+                    self.valves.PROJECT_CACHE_TTL,
+                    metrics,
+                    self.valves.REQUEST_TIMEOUT,
+                )
 
             if not project_map:
+                await metrics.report(__event_emitter__)
                 return "No projects found or unable to retrieve projects."
 
-            # Sort projects by name
-            sorted_projects = sorted(project_map.values())
+            with metrics.stage("format"):
+                # Sort projects by name
+                sorted_projects = sorted(project_map.values())
 
-            # Format the project list
-            project_list = "\n".join(f"- {project}" for project in sorted_projects)
-            result = f"Your projects:\n{project_list}"
+                # Format the project list
+                project_list = "\n".join(f"- {project}" for project in sorted_projects)
+                result = f"Your projects:\n{project_list}"
 
             if __event_emitter__:
                 await __event_emitter__(
@@ -257,6 +1025,7 @@ class Tools:
                 )
 
             logger.debug("Projects retrieved and formatted successfully")
+            await metrics.report(__event_emitter__)
             return result
 
         except Exception as e:
@@ -273,12 +1042,15 @@ class Tools:
                         },
                     }
                 )
+            await metrics.report(__event_emitter__)
             return error_message
+        finally:
+            metrics.finish()
 
 
 # Example usage (for testing, not needed in OpenWebUI)
 if __name__ == "__main__":
-    import asyncio
+    logging.basicConfig(level=logging.DEBUG)
 
     async def main():
         tool = Tools()